@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""Benchmark changelog rendering: Changelog.eval() against precompiled
+output templates of md_changelog.templates.Renderer
+
+    python benchmarks/bench_render.py --entries 5000 --messages 10
+"""
+import argparse
+import os.path as op
+import sys
+import timeit
+
+sys.path.insert(0, op.dirname(op.dirname(op.abspath(__file__))))
+
+from md_changelog import tokens  # noqa: E402
+from md_changelog.entry import Changelog, LogEntry  # noqa: E402
+from md_changelog.templates import PRESETS, Renderer  # noqa: E402
+
+
+def make_changelog(entries, messages):
+    m_types = list(tokens.TYPES)
+    log_entries = []
+    for i in range(entries):
+        entry = LogEntry(version=tokens.Version('%d.%d.0' % divmod(i, 100)),
+                         date=tokens.Date('2017-01-01'))
+        for j in range(messages):
+            entry.add_message(tokens.Message(
+                text='Message number %d of the entry %d' % (j, i),
+                message_type=m_types[j % len(m_types)],
+                author='bob' if j % 3 == 0 else None))
+        log_entries.append(entry)
+    return Changelog(path=None, entries=log_entries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--entries', type=int, default=2000)
+    parser.add_argument('--messages', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    changelog = make_changelog(args.entries, args.messages)
+    # Markdown preset is the same as the changelog file
+    assert Renderer().render_changelog(changelog) == changelog.eval()
+
+    cases = [('Changelog.eval()', changelog.eval)]
+    for preset in sorted(PRESETS):
+        renderer = Renderer(preset=preset)
+        cases.append(('Renderer(%s)' % preset,
+                      lambda r=renderer: r.render_changelog(changelog)))
+
+    print('%d entries, %d messages each, best of %d runs'
+          % (args.entries, args.messages, args.repeat))
+    baseline = None
+    for name, fn in cases:
+        best = min(timeit.repeat(fn, number=1, repeat=args.repeat))
+        baseline = baseline or best
+        print('{:<22}{:>10.1f} ms{:>8.2f}x'.format(name, best * 1000,
+                                                  baseline / best))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+import heapq
+import itertools
+
+from md_changelog.entry import Changelog
+from md_changelog.exceptions import ChangelogError
+
+
+def iter_releases(path):
+    """Stream released entries of the changelog file in the file order, i.e
+    the newest one goes first
+
+    :param path: str: changelog path
+    :return: generator of LogEntry
+    """
+    with open(path) as fd:
+        for entry in Changelog.iter_entries(lines=fd):
+            if entry.released:
+                yield entry
+
+
+def _decorated(index, project, entries):
+    """Decorate entries with a sort key for heapq.merge(): the newest release
+    goes first, ties keep the order of sources and entries. Dates of the
+    file are of day precision
+    """
+    try:
+        for seq, entry in enumerate(entries):
+            yield -entry.date.dt.toordinal(), index, seq, project, entry
+    except ChangelogError as err:
+        raise ChangelogError('Broken changelog of %s: %s' % (project, err))
+
+
+def iter_timeline(sources, since=None):
+    """Merge released entries of many changelogs into one timeline ordered by
+    release date, the newest one goes first.
+
+    Changelogs are streamed and merged with a heap, so only one entry per
+    changelog is kept in memory.
+
+    :param sources: list of (project name, changelog path)
+    :param since: datetime: skip releases older than this
+    :return: generator of (project name, LogEntry)
+    """
+    streams = [_decorated(index, project, iter_releases(path))
+               for index, (project, path) in enumerate(sources)]
+    merged = ((project, entry)
+              for _, _, _, project, entry in heapq.merge(*streams))
+    if since is not None:
+        # Timeline is ordered, so the rest of the files is not read
+        merged = itertools.takewhile(lambda item: item[1].date.dt >= since,
+                                     merged)
+    return merged
+
+
+def render_entry(project, entry):
+    """Render log entry labelled by project
+
+    :param project: str: project name
+    :param entry: LogEntry instance
+    :return: str
+    """
+    header = '%s %s' % (project, entry.header)
+    lines = [header, '-' * len(header)]
+    lines.extend('* %s' % message.eval() for message in entry.messages)
+    return '\n'.join(lines)
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import os.path as op
+import tempfile
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+CACHE_DIR = '.md-changelog-cache'
+# Cache directory ignores itself, so it doesn't show up in VCS status of the
+# project whatever its ignore rules are
+IGNORE_NAME = '.gitignore'
+IGNORE_CONTENT = '# Created by md-changelog automatically\n*\n'
+
+
+def cache_path(changelog_path, name):
+    """Get cache file path for the changelog
+
+    :param changelog_path: str
+    :param name: str: cache file name
+    :return: str
+    """
+    return op.join(op.dirname(op.abspath(changelog_path)), CACHE_DIR, name)
+
+
+def makedirs(path):
+    """Create directory with parents. Cache directory gets the ignore file
+
+    :param path: str: directory path
+    """
+    os.makedirs(path, exist_ok=True)
+    ignore_path = op.join(path, IGNORE_NAME)
+    if op.basename(path) == CACHE_DIR and not op.exists(ignore_path):
+        with open(ignore_path, 'w') as fd:
+            fd.write(IGNORE_CONTENT)
+
+
+@contextmanager
+def lock(changelog_path):
+    """Exclusive inter-process lock of the changelog. Lock file is kept in
+    the cache directory, it's a no-op where flock is not available
+
+    :param changelog_path: str
+    """
+    lock_path = cache_path(changelog_path,
+                           op.basename(changelog_path) + '.lock')
+    makedirs(op.dirname(lock_path))
+    with open(lock_path, 'w') as lock_fd:
+        if fcntl:
+            fcntl.flock(lock_fd, fcntl.LOCK_EX)
+        yield
+
+
+def atomic_write(path, content):
+    """Write file atomically: write temp file and move it to the path.
+    Permissions of the existing file are kept
+
+    :param path: str
+    :param content: str
+    """
+    dir_path = op.dirname(op.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=dir_path, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'w') as tmp:
+            tmp.write(content)
+        if op.exists(path):
+            os.chmod(tmp_path, os.stat(path).st_mode & 0o7777)
+        else:
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(tmp_path, 0o666 & ~umask)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if op.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def load(path, default=None):
+    """Load json cache, broken or missing cache is ignored
+
+    :param path: str
+    :param default: default value
+    :return: cached data
+    """
+    try:
+        with open(path) as fd:
+            return json.load(fd)
+    except (OSError, ValueError):
+        return default
+
+
+def dump(path, data):
+    """Dump data to json cache
+
+    :param path: str
+    :param data: json serializable data
+    """
+    makedirs(op.dirname(path))
+    atomic_write(path, json.dumps(data))
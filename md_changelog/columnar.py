@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+from array import array
+from collections import Counter
+
+from md_changelog import tokens
+from md_changelog.entry import Changelog, LogEntry
+from md_changelog.exceptions import ChangelogError
+
+
+class ColumnarStore(object):
+    """Columnar in-memory changelog storage for huge (aggregated) changelogs.
+
+    Message types and authors are kept as integer codes in compact arrays,
+    message texts in one contiguous utf-8 buffer with offsets and log entries
+    as ranges of message indexes. LogEntry and Message objects are
+    materialized on demand. Entries are kept in the file order, i.e the
+    newest one goes first.
+    """
+
+    MAX_TYPES = 256  # type codes are stored as unsigned chars
+
+    def __init__(self, path=None):
+        self.path = path
+        # type code -> message type
+        self.types = list(tokens.MESSAGE_TYPES.values())
+        self._codes = {m_type: code for code, m_type in enumerate(self.types)}
+
+        self.type_codes = array('B')
+        # author code -> author, 0 is for messages without author
+        self.authors = [None]
+        self._author_codes = {None: 0}
+        self.author_codes = array('I')
+        self.buffer = bytearray()
+        # Text of message i is buffer[offsets[i]:offsets[i + 1]]
+        self.offsets = array('Q', [0])
+        # Messages of entry i are [bounds[i], bounds[i + 1])
+        self.bounds = array('Q', [0])
+        self.versions = []
+        self.dates = []
+
+    @classmethod
+    def parse(cls, path):
+        """Parse changelog file into the store. The file is streamed, only
+        one log entry is materialized at a time
+
+        :param path: str
+        :return: ColumnarStore instance
+        """
+        instance = cls(path=path)
+        with open(path) as fd:
+            for entry in Changelog.iter_entries(lines=fd):
+                instance.append_entry(entry)
+        return instance
+
+    @classmethod
+    def from_changelog(cls, changelog):
+        """Create store from Changelog instance
+
+        :param changelog: Changelog instance
+        :return: ColumnarStore instance
+        """
+        instance = cls(path=changelog.path)
+        for entry in reversed(changelog.entries):
+            instance.append_entry(entry)
+        return instance
+
+    def type_code(self, message_type):
+        code = self._codes.get(message_type)
+        if code is None:
+            if len(self.types) >= self.MAX_TYPES:
+                raise ChangelogError('Too many message types, max is %d'
+                                     % self.MAX_TYPES)
+            code = len(self.types)
+            self.types.append(message_type)
+            self._codes[message_type] = code
+        return code
+
+    def author_code(self, author):
+        code = self._author_codes.get(author)
+        if code is None:
+            code = len(self.authors)
+            self.authors.append(author)
+            self._author_codes[author] = code
+        return code
+
+    def append_entry(self, entry):
+        """Append log entry columns
+
+        :param entry: LogEntry instance
+        """
+        for message in entry.messages:
+            self.type_codes.append(self.type_code(message.type))
+            self.author_codes.append(self.author_code(message.author))
+            self.buffer.extend(message.text.encode('utf-8'))
+            self.offsets.append(len(self.buffer))
+        self.bounds.append(len(self.type_codes))
+        self.versions.append(entry.version)
+        self.dates.append(entry.date)
+
+    @property
+    def message_count(self):
+        return len(self.type_codes)
+
+    def text(self, index):
+        return self.buffer[self.offsets[index]:
+                           self.offsets[index + 1]].decode('utf-8')
+
+    def message(self, index):
+        """Materialize message
+
+        :param index: int: message index
+        :return: Message instance
+        """
+        return tokens.Message(
+            text=self.text(index),
+            message_type=self.types[self.type_codes[index]],
+            author=self.authors[self.author_codes[index]])
+
+    def iter_messages(self, entry_index):
+        """Materialize messages of the entry one by one
+
+        :param entry_index: int
+        :return: generator of Message
+        """
+        for index in range(self.bounds[entry_index],
+                           self.bounds[entry_index + 1]):
+            yield self.message(index)
+
+    def entry(self, index):
+        """Materialize log entry
+
+        :param index: int: entry index, 0 is the newest one
+        :return: LogEntry instance
+        """
+        if index < 0:
+            index += len(self)
+        entry = LogEntry(version=self.versions[index], date=self.dates[index])
+        for message in self.iter_messages(index):
+            entry.add_message(message)
+        return entry
+
+    def type_counts(self, entry_index=None):
+        """Count messages per type of the entry or of the whole store
+
+        :param entry_index: int: entry index, all entries if not passed
+        :return: dict: {message type: count}
+        """
+        if entry_index is None:
+            codes = self.type_codes
+        else:
+            codes = self.type_codes[self.bounds[entry_index]:
+                                    self.bounds[entry_index + 1]]
+        return {self.types[code]: count
+                for code, count in Counter(codes).items()}
+
+    def to_changelog(self):
+        """Materialize the whole store into Changelog instance
+
+        :return: Changelog instance
+        """
+        entries = [self.entry(index) for index in range(len(self))]
+        return Changelog(path=self.path, entries=entries[::-1])
+
+    def __len__(self):
+        return len(self.versions)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self.entry(index)
+
+    def __repr__(self):
+        return '%s(entries=%d, messages=%d)' % (
+            self.__class__.__name__, len(self), self.message_count)
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+import argparse
+import os.path as op
+
+from md_changelog import cache, tokens
+
+CACHE_NAME = 'completion'
+
+BASH_TEMPLATE = '''# md-changelog bash completion.
+# Versions and message types are read from the cache refreshed on changelog
+# save, neither python nor the changelog is touched on TAB press.
+_md_changelog_cache() {
+    local cfg="" dir="$PWD" i changelog
+    for ((i=1; i < COMP_CWORD; i++)); do
+        case "${COMP_WORDS[i]}" in
+            -c|--config) cfg="${COMP_WORDS[i+1]}";;
+        esac
+    done
+    # Config is looked up in the current directory and its parents
+    while [ -z "$cfg" ]; do
+        if [ -f "$dir/%(config_name)s" ]; then
+            cfg="$dir/%(config_name)s"
+        elif [ -z "$dir" ] || [ "$dir" = / ]; then
+            return
+        else
+            dir=$(dirname "$dir")
+        fi
+    done
+    [ -f "$cfg" ] || return
+    changelog=$(sed -n 's/^changelog *= *//p' "$cfg")
+    # Relative changelog path is relative to the config directory
+    case "$changelog" in
+        /*) ;;
+        *) changelog="$(dirname "$cfg")/$changelog";;
+    esac
+    echo "$(dirname "$changelog")/%(cache_dir)s/%(cache_name)s"
+}
+
+_md_changelog_cached() {
+    local cache_file
+    cache_file=$(_md_changelog_cache)
+    [ -f "$cache_file" ] && sed -n "s/^$1 //p" "$cache_file"
+}
+
+_md_changelog() {
+    local cur="${COMP_WORDS[COMP_CWORD]}" prev="${COMP_WORDS[COMP_CWORD-1]}"
+    local cmd="" i words
+    for ((i=1; i < COMP_CWORD; i++)); do
+        case "${COMP_WORDS[i]}" in
+            -c|--config) ((i++));;
+            -*) ;;
+            *) cmd="${COMP_WORDS[i]}"; break;;
+        esac
+    done
+
+    case "$cmd:$prev" in
+        %(version_options)s)
+            words=$(_md_changelog_cached versions);;
+        *:-c|*:--config)
+            COMPREPLY=($(compgen -f -- "$cur")); return;;
+        :*)
+            words="%(commands)s $(_md_changelog_cached types)";;
+        *)
+            case "$cmd" in
+%(command_options)s
+                *) words="%(message_options)s";;
+            esac;;
+    esac
+    COMPREPLY=($(compgen -W "$words" -- "$cur"))
+}
+complete -o default -F _md_changelog md-changelog
+'''
+
+
+def get_cache_path(changelog_path):
+    return cache.cache_path(changelog_path, CACHE_NAME)
+
+
+def write_cache(changelog):
+    """Write completion cache: versions (the newest one goes first) and
+    message types
+
+    :param changelog: Changelog instance
+    """
+    versions = [str(entry.version) for entry in reversed(changelog.entries)]
+    lines = ['versions %s' % ' '.join(versions),
+             'types %s' % ' '.join(tokens.MESSAGE_TYPES)]
+    path = get_cache_path(changelog.path)
+    cache.makedirs(op.dirname(path))
+    cache.atomic_write(path, '\n'.join(lines) + '\n')
+
+
+def refresh_cache(changelog):
+    """Refresh completion cache if it is enabled, i.e the cache file exists
+
+    :param changelog: Changelog instance
+    """
+    if changelog.path and op.exists(get_cache_path(changelog.path)):
+        write_cache(changelog)
+
+
+def bash_script(parser, version_options, config_name='.md-changelog.cfg'):
+    """Generate bash completion script
+
+    :param parser: argparse.ArgumentParser instance
+    :param version_options: dict: {command: options taking version}
+    :param config_name: str: config file name looked up in the current
+        directory and its parents
+    :return: str
+    """
+    subparsers = next(action for action in parser._actions
+                      if isinstance(action, argparse._SubParsersAction))
+    commands, command_options = [], []
+    message_options = ''
+    for name, subparser in subparsers.choices.items():
+        options = ' '.join(option for action in subparser._actions
+                           for option in action.option_strings)
+        # Message commands are told by their type, custom types may be named
+        # like other commands
+        if subparser.get_default('message_type') is not None:
+            message_options = options
+        else:
+            command_options.append(' ' * 16 + '%s) words="%s";;'
+                                   % (name, options))
+        commands.append(name)
+    patterns = ['%s:%s' % (command, option)
+                for command, options in sorted(version_options.items())
+                for option in options]
+    return BASH_TEMPLATE % {
+        'config_name': config_name,
+        'cache_dir': cache.CACHE_DIR,
+        'cache_name': CACHE_NAME,
+        'version_options': '|'.join(patterns),
+        'commands': ' '.join(commands),
+        'command_options': '\n'.join(command_options),
+        'message_options': message_options,
+    }
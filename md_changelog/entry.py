@@ -1,12 +1,29 @@
 # -*- coding: utf-8 -*-
 import abc
 import copy
+import hashlib
+import os
 import re
-
-from md_changelog import tokens
+import statistics
+from collections import Counter, OrderedDict, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import repeat
+
+from md_changelog import cache, completion, tokens
 from md_changelog.exceptions import ChangelogError
 from md_changelog.tokens import Version, Date, Message
 
+# Result of Changelog.diff(): lists of added/removed LogEntry and EntryChange
+ChangelogDiff = namedtuple('ChangelogDiff', ['added', 'removed', 'changed'])
+EntryChange = namedtuple('EntryChange', ['old', 'new', 'added', 'removed'])
+
+# Rendering modes: messages listed in the insertion order or grouped by type
+MODE_LIST = 'list'
+MODE_GROUP = 'group'
+MODES = (MODE_LIST, MODE_GROUP)
+
 
 class Evaluable(object):
     """Evaluable interface class. Just indicate that class has .eval() method
@@ -29,6 +46,7 @@ class LogEntry(Evaluable):
         self._version = version
         self._date = date
         self._messages = []
+        self._index = set()  # normalized message keys
 
     @property
     def declared(self):
@@ -47,7 +65,30 @@ class LogEntry(Evaluable):
     def version(self):
         return self._version
 
-    def eval(self):
+    @property
+    def date(self):
+        return self._date
+
+    @property
+    def messages(self):
+        return self._messages
+
+    @property
+    def digest(self):
+        """Content hash of the entry: version, date and messages
+
+        :return: str: hex digest
+        """
+        return hashlib.sha1(self.eval().encode('utf-8')).hexdigest()
+
+    def eval(self, mode=MODE_LIST):
+        """Render log entry
+
+        :param mode: str: one of MODES
+        :return: str
+        """
+        if mode == MODE_GROUP:
+            return self.eval_grouped()
         header = self.header
         text_tokens = (header,
                        '-' * len(header),
@@ -55,11 +96,52 @@ class LogEntry(Evaluable):
                                   for entry in self._messages]))
         return '\n'.join(text_tokens)
 
-    def add_message(self, message):
+    def eval_grouped(self):
+        """Render log entry with messages grouped by type under headings,
+        e.g '### Features'. Messages are bucketed in a single pass, the order
+        within a group is kept
+
+        :return: str
+        """
+        buckets = OrderedDict((m_type, []) for m_type in tokens.group_order())
+        for message in self._messages:
+            buckets.setdefault(message.type, []).append(
+                message.eval(typed=False))
+        header = self.header
+        text_tokens = [header, '-' * len(header)]
+        for m_type, texts in buckets.items():
+            if not texts:
+                continue
+            if len(text_tokens) > 2:
+                text_tokens.append('')
+            text_tokens.append('### %s' % tokens.group_title(m_type))
+            text_tokens.extend('* %s' % text for text in texts)
+        return '\n'.join(text_tokens)
+
+    def add_message(self, message, dedupe=False):
+        """Add message to the entry
+
+        :param message: Message instance
+        :param dedupe: bool: skip the message if the entry already has it
+        :return: bool: True if message is added
+        """
         if not isinstance(message, tokens.Message):
             raise ValueError('Wrong message type %r, must be %s'
                              % (message, tokens.Message))
+        key = message.normalized_key
+        if dedupe and key in self._index:
+            return False
         self._messages.append(message)
+        self._index.add(key)
+        return True
+
+    def has_message(self, message):
+        """Check if the entry has the message ignoring case and whitespaces
+
+        :param message: Message instance
+        :rtype: bool
+        """
+        return message.normalized_key in self._index
 
     def set_version(self, version):
         cond = (self._version is None,
@@ -80,6 +162,58 @@ class LogEntry(Evaluable):
             raise ChangelogError(
                 "Can't add date because it's already exists")
 
+    def suggest_bump(self):
+        """Suggest version part to bump based on message types:
+        breaking changes -> major, features -> minor, otherwise patch
+
+        :return: str: one of Version.BUMP_PARTS
+        """
+        types = {message.type for message in self._messages}
+        if tokens.TYPES.breaking in types:
+            return 'major'
+        elif tokens.TYPES.feature in types:
+            return 'minor'
+        return 'patch'
+
+    @property
+    def released(self):
+        return bool(self._version and self._version.released and
+                    self._date and self._date.is_set())
+
+    def to_dict(self):
+        """Export entry to dict
+
+        :return: dict: json serializable entry
+        """
+        return {
+            'version': str(self._version),
+            'date': self._date.eval() if self._date else None,
+            'released': self.released,
+            'messages': [self._message_dict(message)
+                         for message in self._messages],
+        }
+
+    @staticmethod
+    def _message_dict(message):
+        data = {'type': tokens.type_name(message.type), 'text': message.text}
+        if message.author:
+            data['author'] = message.author
+        return data
+
+    def stats(self):
+        """Count messages per type
+
+        :return: dict: json serializable entry stats
+        """
+        counts = Counter(message.type for message in self._messages)
+        return {
+            'version': str(self._version),
+            'date': self._date.eval() if self._date else None,
+            'messages': len(self._messages),
+            'types': {tokens.type_name(m_type): count
+                      for m_type, count in counts.items()},
+        }
+
     @property
     def header(self):
         return '{version} ({date})'.format(version=self._version.eval(),
@@ -114,17 +248,32 @@ class LogEntry(Evaluable):
                     self._messages == other._messages])
 
 
+def _parse_chunk(text, types):
+    """Parse changelog chunk in a worker process
+
+    :param text: str: changelog chunk
+    :param types: dict: custom message types as config values with group
+        titles, workers may be spawned without parent process state
+    """
+    tokens.register_types(types)
+    return Changelog.parse_entries(text=text)
+
+
 class Changelog(object):
     """Changelog representation"""
 
     IGNORE_LINES_RE = re.compile(r'([-=]{3,})')  # ----, ===
+    GROUP_RE = re.compile(r'^#{2,4} +(?P<title>.+?) *$')  # ### Features
     INIT_VERSION = '0.1.0'
+    PARALLEL_MIN_SIZE = 1 << 20  # smaller texts are parsed sequentially
 
-    def __init__(self, path, entries=None):
+    def __init__(self, path, entries=None, mode=MODE_LIST):
         self.header = 'Changelog'
         self.path = path
         self.entries = entries or []
+        self.mode = mode
         self._backup = None
+        self._in_transaction = False
 
     @property
     def last_entry(self):
@@ -139,17 +288,37 @@ class Changelog(object):
         return [entry.version for entry in self.entries]
 
     @classmethod
-    def parse(cls, path):
+    def parse(cls, path, workers=None, mode=MODE_LIST):
         """Parse changelog
 
         :param path: str
+        :param workers: int: number of processes to parse huge changelog in
+            parallel, see parse_entries_parallel()
+        :param mode: str: rendering mode of the saved file, one of MODES.
+            Both layouts are parsed regardless of the mode
         :return: Changelog instance
         """
         with open(path) as fd:
             content = fd.read()
-        entries = cls.parse_entries(text=content)
-        instance = Changelog(path=path, entries=entries[::-1])
-        return instance
+        return cls.from_text(text=content, path=path, workers=workers,
+                             mode=mode)
+
+    @classmethod
+    def from_text(cls, text, path=None, workers=None, mode=MODE_LIST):
+        """Create changelog from raw text, e.g file content from VCS revision
+
+        :param text: str: raw changelog text
+        :param path: str: optional changelog path
+        :param workers: int: number of processes to parse huge changelog in
+            parallel, see parse_entries_parallel()
+        :param mode: str: rendering mode of the saved file, one of MODES
+        :return: Changelog instance
+        """
+        if workers:
+            entries = cls.parse_entries_parallel(text=text, workers=workers)
+        else:
+            entries = cls.parse_entries(text=text)
+        return Changelog(path=path, entries=entries[::-1], mode=mode)
 
     @classmethod
     def parse_entries(cls, text):
@@ -158,37 +327,159 @@ class Changelog(object):
         :param text: str: raw changelog text
         :rtype: list
         """
-        entries = []
-        stack = []
+        return list(cls.iter_entries(lines=text.splitlines()))
+
+    @classmethod
+    def iter_entries(cls, lines):
+        """Parse lines into log entries one by one. Only the current entry is
+        kept in memory, so it can be used to stream huge changelog files.
+        Untyped messages under a group heading of the grouped layout, e.g
+        '### Features', get the group type
+
+        :param lines: iterable of str, e.g file object
+        :return: generator of LogEntry in the file order
+        """
         log_entry = None
-        for line in text.splitlines():
-            # Skip comments or empty lines
-            if line.startswith('#') or not line:
+        group_type = None
+        for line in lines:
+            line = line.rstrip('\r\n')
+            # Skip empty lines
+            if not line:
+                continue
+            if line.startswith('#'):
+                # Group heading within an entry, otherwise a comment
+                match = cls.GROUP_RE.match(line)
+                if match and log_entry is not None:
+                    group_type = tokens.GROUP_LABELS.get(
+                        match.group('title').lower())
                 continue
             if cls.IGNORE_LINES_RE.search(line):
                 continue
 
             if LogEntry.is_header(line):
-                log_entry = LogEntry()
-                stack.append(log_entry)
-                if not log_entry.declared:
-                    # New log entry
-                    log_entry.set_version(Version.parse(line))
-                    log_entry.set_date(Date.parse(line))
-                else:
-                    entries.append(log_entry)
-                    stack.pop()
-
-                    log_entry = LogEntry()
-                    stack.append(log_entry)
-            elif log_entry and log_entry.declared and LogEntry.is_message(line):
+                if log_entry is not None:
+                    yield log_entry
+                log_entry = LogEntry(version=Version.parse(line),
+                                     date=Date.parse(line))
+                group_type = None
+            elif log_entry is not None:
                 # parse messages only after log header is declared
-                log_entry.add_message(Message.parse(line))
-            else:
-                continue
-        if stack:
-            entries.extend(stack)
-        return entries
+                message = Message.parse(line, default_type=group_type)
+                if message:
+                    log_entry.add_message(message)
+        if log_entry is not None:
+            yield log_entry
+
+    @classmethod
+    def parse_entries_parallel(cls, text, workers=None, min_size=None):
+        """Parse text into log entries in a process pool. Text is split into
+        chunks at header lines, so the result is the same as parse_entries()
+
+        :param text: str: raw changelog text
+        :param workers: int: number of processes, CPU count by default
+        :param min_size: int: texts smaller than this are parsed sequentially,
+            PARALLEL_MIN_SIZE by default
+        :rtype: list
+        """
+        workers = workers or os.cpu_count() or 1
+        if min_size is None:
+            min_size = cls.PARALLEL_MIN_SIZE
+        if workers < 2 or len(text) < min_size:
+            return cls.parse_entries(text=text)
+
+        # More chunks than workers to balance uneven entries
+        chunks = cls.split_chunks(text, count=workers * 4)
+        # Custom message types are passed along with every chunk, workers
+        # may be spawned without parent process state. Values include group
+        # titles, e.g 'Security, Security fixes', to parse group headings
+        types = {name: '%s, %s' % (value, tokens.group_title(value))
+                 for name, value in tokens.custom_types().items()}
+        types = repeat(types, len(chunks))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return [entry
+                    for entries in executor.map(_parse_chunk, chunks, types)
+                    for entry in entries]
+
+    @classmethod
+    def split_chunks(cls, text, count):
+        """Split raw text into about `count` chunks of the same size. Every
+        chunk but the first one starts with a header line.
+        ''.join(chunks) == text
+
+        :param text: str: raw changelog text
+        :param count: int: number of chunks
+        :rtype: list
+        """
+        size = len(text)
+        bounds = [0]
+        for i in range(1, count):
+            pos = cls._find_header(text, max(size * i // count, bounds[-1]))
+            if pos is None:
+                break
+            if pos > bounds[-1]:
+                bounds.append(pos)
+        bounds.append(size)
+        return [text[start:end] for start, end in zip(bounds, bounds[1:])]
+
+    @classmethod
+    def _find_header(cls, text, pos):
+        """Find offset of the first header line starting at or after pos
+
+        :param text: str: raw changelog text
+        :param pos: int: offset
+        :return: int or None
+        """
+        if pos > 0 and text[pos - 1] != '\n':
+            pos = text.find('\n', pos)
+            if pos == -1:
+                return None
+            pos += 1
+        while pos < len(text):
+            end = text.find('\n', pos)
+            if end == -1:
+                end = len(text)
+            lines = text[pos:end].splitlines()
+            if lines and cls.is_header_line(lines[0], strict=False):
+                return pos
+            pos = end + 1
+        return None
+
+    @classmethod
+    def is_header_line(cls, line, strict=True):
+        """Check if raw changelog line is a log entry header
+
+        :param line: str: line without line break
+        :param strict: bool: raise ChangelogError on broken header
+        :rtype: bool
+        """
+        if not line or line.startswith('#') \
+                or cls.IGNORE_LINES_RE.search(line):
+            return False
+        try:
+            return LogEntry.is_header(line)
+        except ChangelogError:
+            if strict:
+                raise
+            return False
+
+    @classmethod
+    def split_blocks(cls, text):
+        """Split raw text into blocks without parsing messages: the preamble
+        followed by log entry blocks, each one starts with a header line.
+        ''.join(blocks) == text
+
+        :param text: str: raw changelog text
+        :rtype: list
+        """
+        blocks = []
+        block = []
+        for line in text.splitlines(keepends=True):
+            if cls.is_header_line(line.rstrip('\r\n')):
+                blocks.append(''.join(block))
+                block = []
+            block.append(line)
+        blocks.append(''.join(block))
+        return blocks
 
     def new_entry(self):
         """Create and add new unreleased log entry
@@ -198,16 +489,96 @@ class Changelog(object):
         self.make_backup()
         log_entry = LogEntry()
         if len(self.entries) == 0:
-            last_version = self.INIT_VERSION
+            last_version = Version(self.INIT_VERSION)
         else:
-            last_version = str(self.last_entry.version)
+            last_version = self.last_entry.version
 
-        v = Version(version_str='%s+1' % last_version)
-        log_entry.set_version(version=v)
+        log_entry.set_version(version=last_version.unreleased())
         log_entry.set_date(date=Date(dt=''))  # set Date as unreleased
         self.entries.append(log_entry)
         return log_entry
 
+    def message_index(self):
+        """Build index of normalized message keys over all the entries to
+        detect duplicates in the whole history
+
+        :return: set
+        """
+        index = set()
+        for entry in self.entries:
+            index.update(entry._index)
+        return index
+
+    def stats(self, since=None, until=None):
+        """Compute changelog stats in a single pass: message counts per type
+        per release, messages per release and release cadence
+
+        :param since: str: the first version of the range, inclusive
+        :param until: str: the last version of the range, inclusive
+        :return: dict: json serializable stats
+        """
+        releases, unreleased = [], None
+        for entry in self.entries:
+            if entry.released:
+                releases.append(entry.stats())
+            else:
+                unreleased = entry.stats()
+        return self.summarize_stats(releases, unreleased=unreleased,
+                                    since=since, until=until)
+
+    @staticmethod
+    def summarize_stats(releases, unreleased=None, since=None, until=None):
+        """Summarize log entries stats
+
+        :param releases: list of LogEntry.stats() of released entries, the
+            oldest one goes first
+        :param unreleased: dict: LogEntry.stats() of unreleased entry
+        :param since: str: the first version of the range, inclusive
+        :param until: str: the last version of the range, inclusive
+        :return: dict
+        """
+        since = Version(since) if since else None
+        until = Version(until) if until else None
+        selected = []
+        totals = Counter()
+        for item in releases:
+            version = Version(item['version'])
+            if since and version < since or until and version > until:
+                continue
+            selected.append(item)
+            totals.update(item['types'])
+
+        dates = [datetime.strptime(item['date'], Date.DATE_FMT)
+                 for item in selected]
+        gaps = [(cur - prev).days for prev, cur in zip(dates, dates[1:])]
+        messages = sum(item['messages'] for item in selected)
+        return {
+            'releases': selected,
+            'unreleased': unreleased,
+            'messages': messages,
+            'types': dict(totals),
+            'messages_per_release': messages / len(selected)
+            if selected else 0,
+            'cadence': {
+                'mean_days': statistics.mean(gaps) if gaps else None,
+                'median_days': statistics.median(gaps) if gaps else None,
+                'min_days': min(gaps) if gaps else None,
+                'max_days': max(gaps) if gaps else None,
+            },
+        }
+
+    def next_version(self, part=None):
+        """Compute the release version of the unreleased entry
+
+        :param part: str: version part to bump, one of Version.BUMP_PARTS.
+            Suggested by the unreleased entry messages if not passed
+        :return: Version instance
+        """
+        last_entry = self.last_entry
+        if not last_entry or last_entry.version.released:
+            raise ChangelogError('No UNRELEASED entries')
+        return last_entry.version.bump(part or last_entry.suggest_bump())
+
     def add_entry(self, entry):
         if not isinstance(entry, LogEntry):
             raise ValueError('Wrong entry type %r, must be %s'
@@ -216,16 +587,53 @@ class Changelog(object):
         self.entries.append(entry)
 
     def save(self):
-        """Save and sync changes
+        """Save and sync changes. The file is written atomically
         """
-        with open(self.path, 'w') as fd:
-            fd.write(self.eval())
+        cache.atomic_write(self.path, self.eval())
+        completion.refresh_cache(self)
+
+    @classmethod
+    @contextmanager
+    def transaction(cls, path, mode=MODE_LIST, on_save=None):
+        """Batch changelog changes: the file is locked and parsed once, no
+        backups are made on changes and the file is written once atomically
+        on exit. Nothing is written if an exception is raised.
+
+            with Changelog.transaction(path) as changelog:
+                changelog.new_entry().add_message(message)
+
+        :param path: str: changelog path
+        :param mode: str: rendering mode of the saved file, one of MODES
+        :param on_save: callable: on_save(old_text, new_text) is called
+            after the file is written, while it's still locked
+        :return: Changelog instance
+        """
+        with cache.lock(path):
+            with open(path) as fd:
+                snapshot = fd.read()
+            changelog = cls.from_text(text=snapshot, path=path, mode=mode)
+            changelog._in_transaction = True
+            try:
+                yield changelog
+            except BaseException:
+                # Roll back in-memory changes
+                changelog.entries = cls.parse_entries(text=snapshot)[::-1]
+                raise
+            finally:
+                changelog._in_transaction = False
+
+            content = changelog.eval()
+            if content != snapshot:
+                cache.atomic_write(path, content)
+                completion.refresh_cache(changelog)
+                if on_save is not None:
+                    on_save(snapshot, content)
 
     def reload(self):
         """Reload changelog within the same instance
 
         """
-        reloaded = self.parse(self.path)
+        reloaded = self.parse(self.path, mode=self.mode)
         self.__dict__ = copy.deepcopy(reloaded.__dict__)
 
     def undo(self):
@@ -235,17 +643,72 @@ class Changelog(object):
         return False
 
     def make_backup(self):
-        """Make deep copy of itself
+        """Make deep copy of itself. Skipped within transaction, see
+        transaction()
         """
+        if self._in_transaction:
+            return
         self._backup = copy.deepcopy(self)
 
+    def diff(self, other):
+        """Compare with other changelog entry-by-entry.
+
+        Entries are matched by content hash first, so unchanged history is
+        skipped without comparing texts. Remaining entries are paired by
+        version to find changed ones.
+
+        :param other: Changelog instance, the newer one
+        :return: ChangelogDiff
+        """
+        ours = {entry.digest: entry for entry in self.entries}
+        theirs = {entry.digest: entry for entry in other.entries}
+        removed = [entry for digest, entry in ours.items()
+                   if digest not in theirs]
+        added = [entry for digest, entry in theirs.items()
+                 if digest not in ours]
+
+        removed_by_version = OrderedDict()
+        for entry in removed:
+            removed_by_version.setdefault(str(entry.version), []).append(entry)
+
+        changed, new_entries = [], []
+        for entry in added:
+            candidates = removed_by_version.get(str(entry.version))
+            if not candidates:
+                new_entries.append(entry)
+                continue
+            old = candidates.pop(0)
+            # Authors are compared too, so author changes are reported as
+            # removed and added messages
+            old_messages = {m.full_key: m for m in old.messages}
+            new_messages = {m.full_key: m for m in entry.messages}
+            old_counts = Counter(m.full_key for m in old.messages)
+            new_counts = Counter(m.full_key for m in entry.messages)
+            changed.append(EntryChange(
+                old=old, new=entry,
+                added=[new_messages[key] for key in
+                       (new_counts - old_counts).elements()],
+                removed=[old_messages[key] for key in
+                         (old_counts - new_counts).elements()]))
+        return ChangelogDiff(added=new_entries,
+                             removed=[entry for group in
+                                      removed_by_version.values()
+                                      for entry in group],
+                             changed=changed)
+
     def __repr__(self):
         return "%s(entries=%d)" % (self.__class__.__name__, len(self.entries))
 
-    def eval(self):
+    def eval(self, mode=None):
+        """Render changelog
+
+        :param mode: str: one of MODES, the changelog mode by default
+        :return: str
+        """
+        mode = mode or self.mode
         lines = ['Changelog\n=========\n\n']
-        lines.append(
-            '\n\n'.join([entry.eval() for entry in reversed(self.entries)]))
+        lines.append('\n\n'.join([entry.eval(mode=mode)
+                                   for entry in reversed(self.entries)]))
         lines.append('\n\n')
         return ''.join(lines)
 
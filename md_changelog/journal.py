@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+import json
+import os.path as op
+from datetime import datetime
+
+from md_changelog import cache
+from md_changelog.entry import Changelog
+from md_changelog.exceptions import ChangelogError
+
+DEFAULT_SIZE = 50
+
+
+def block_delta(old_text, new_text):
+    """Compute the changed region of the changelog at the log entry block
+    level, see Changelog.split_blocks(). Unchanged blocks on top and at the
+    bottom are skipped, so a delta normally holds a single entry
+
+    :param old_text: str: raw changelog text before the change
+    :param new_text: str: raw changelog text after the change
+    :return: dict: {'offset': int, 'old': str, 'new': str}, offset of the
+        changed region in both texts
+    """
+    old_blocks = Changelog.split_blocks(old_text)
+    new_blocks = Changelog.split_blocks(new_text)
+    size = min(len(old_blocks), len(new_blocks))
+    start = 0
+    while start < size and old_blocks[start] == new_blocks[start]:
+        start += 1
+    end = 0
+    while end < size - start and old_blocks[-end - 1] == new_blocks[-end - 1]:
+        end += 1
+    return {
+        'offset': sum(len(block) for block in old_blocks[:start]),
+        'old': ''.join(old_blocks[start:len(old_blocks) - end]),
+        'new': ''.join(new_blocks[start:len(new_blocks) - end]),
+    }
+
+
+class Journal(object):
+    """Persistent undo journal of the changelog operations.
+
+    Every operation is recorded as a delta of the changed log entry blocks,
+    not a copy of the file. Deltas are undone in reverse order by splicing
+    the old text back at the recorded offset, the changelog is not parsed.
+    The journal keeps the last `size` operations.
+    """
+
+    def __init__(self, changelog_path, size=DEFAULT_SIZE):
+        """
+        :param changelog_path: str
+        :param size: int: max number of recorded operations
+        """
+        self.changelog_path = changelog_path
+        self.size = size
+
+    @property
+    def path(self):
+        return cache.cache_path(
+            self.changelog_path, op.basename(self.changelog_path) + '.journal')
+
+    def records(self):
+        """Recorded operations, the oldest one goes first. Broken records
+        are ignored
+
+        :return: list of dict
+        """
+        records = []
+        try:
+            with open(self.path) as fd:
+                for line in fd:
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        continue
+        except OSError:
+            pass
+        return records
+
+    def _write(self, records):
+        cache.makedirs(op.dirname(self.path))
+        cache.atomic_write(self.path, ''.join(
+            json.dumps(record, ensure_ascii=False) + '\n'
+            for record in records[-self.size:]))
+
+    def record(self, operation, old_text, new_text):
+        """Record operation delta. It's called while the changelog is locked,
+        see Changelog.transaction()
+
+        :param operation: str: operation name, e.g 'release'
+        :param old_text: str: raw changelog text before the operation
+        :param new_text: str: raw changelog text after the operation
+        """
+        record = block_delta(old_text, new_text)
+        record['operation'] = operation
+        record['time'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        self._write(self.records() + [record])
+
+    def undo(self, count=1):
+        """Undo the last operations
+
+        :param count: int: number of operations
+        :return: list of undone records, the latest one goes first
+        """
+        with cache.lock(self.changelog_path):
+            records = self.records()
+            undone = records[len(records) - min(count, len(records)):][::-1]
+            if not undone:
+                return []
+            with open(self.changelog_path) as fd:
+                text = fd.read()
+            for record in undone:
+                start = record['offset']
+                end = start + len(record['new'])
+                if text[start:end] != record['new']:
+                    raise ChangelogError(
+                        "Can't undo '%s' of %s: changelog is changed since"
+                        % (record['operation'], record['time']))
+                text = text[:start] + record['old'] + text[end:]
+            cache.atomic_write(self.changelog_path, text)
+            self._write(records[:len(records) - len(undone)])
+        return undone
+
+    @staticmethod
+    def describe(record):
+        """Short description of the changed region: the first changed entry
+        header
+
+        :param record: dict
+        :return: str
+        """
+        for text in (record['new'], record['old']):
+            for line in text.splitlines():
+                if Changelog.is_header_line(line, strict=False):
+                    return line.strip()
+        return ''
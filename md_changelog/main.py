@@ -3,16 +3,24 @@
 import argparse
 import configparser
 import functools
+import itertools
+import json
 import logging
 import os
 import os.path as op
 import subprocess
+import tempfile
 
 import sys
 
-from md_changelog import tokens
-from md_changelog.entry import Changelog
-from md_changelog.exceptions import ConfigNotFoundError
+from md_changelog import aggregate, cache, completion, journal, stats, \
+    tokens
+from md_changelog.entry import MODES, MODE_LIST, Changelog
+from md_changelog.exceptions import ChangelogError, ConfigNotFoundError
+from md_changelog.publish import Publisher
+from md_changelog.templates import PRESETS, Renderer
+from md_changelog.utils.git import GitBackend
+from md_changelog.watch import Watcher
 
 logging.basicConfig(
     level=logging.DEBUG,
@@ -28,19 +36,33 @@ INIT_TEMPLATE = 'Changelog\n' \
                 '--------------------' % Changelog.INIT_VERSION
 CONFIG_NAME = '.md-changelog.cfg'
 DEFAULT_VCS = 'git'
+DEFAULT_TAG_FORMAT = 'v{version}'
+# Command options taking version, they are completed from the cache
+VERSION_OPTIONS = {
+    'release': ['-v', '--version'],
+    'stats': ['--since', '--until'],
+    'show': ['--since', '--until'],
+    'render': ['--since', '--until'],
+}
+VCS_BACKENDS = {'git': GitBackend}
 
 
 def handler(fn):
-    """Helper decorator for command-line handler functions
+    """Helper decorator for command-line handler functions: the project
+    context is resolved and passed along with args
 
-    :param fn: decorated function
+    :param fn: decorated function: fn(args, context)
     :return:
     """
 
-    @functools.wraps
+    @functools.wraps(fn)
     def wrapper(args):
-        config = get_config(path=args.config)
-        res = fn(args, config)
+        try:
+            context = ProjectContext.resolve(config_path=args.config)
+        except ConfigNotFoundError as err:
+            logger.info("%s. Run 'md-changelog init'", err)
+            sys.exit(99)
+        res = fn(args, context)
         return res
     return wrapper
 
@@ -75,7 +97,9 @@ def init(args):
         config = configparser.ConfigParser()
         config['md-changelog'] = {
             'changelog': changelog_path,
-            'vcs': DEFAULT_VCS
+            'vcs': DEFAULT_VCS,
+            'tag_format': DEFAULT_TAG_FORMAT,
+            'mode': MODE_LIST,
         }
 
         logger.info('Writing config %s', cfg_path)
@@ -96,28 +120,209 @@ def init(args):
     init_config(path)
 
 
+def find_config(start=None):
+    """Find config in the directory or its parents, like git finds the
+    repository
+
+    :param start: str: directory to start from, the current one by default
+    :return: str: config path
+    """
+    path = op.abspath(start or os.getcwd())
+    while True:
+        cfg_path = op.join(path, CONFIG_NAME)
+        if op.isfile(cfg_path):
+            return cfg_path
+        parent = op.dirname(path)
+        if parent == path:
+            raise ConfigNotFoundError(
+                'Config is not found in %s or its parents'
+                % op.abspath(start or os.getcwd()))
+        path = parent
+
+
 def get_config(path=None):
     if path is not None:
         cfg_path = path
     else:
-        cfg_path = op.join(op.abspath('.'), CONFIG_NAME)
+        cfg_path = find_config()
     if not op.exists(cfg_path):
         raise ConfigNotFoundError('Config is not found: %s' % path)
 
     config = configparser.ConfigParser()
-    config.read(cfg_path)
+    try:
+        config.read(cfg_path)
+        if config.has_section('types'):
+            # Custom message types, e.g security = Security
+            tokens.register_types(config['types'])
+    except configparser.Error as err:
+        raise ChangelogError('Broken config %s: %s' % (cfg_path, err))
     return config
 
 
+class ProjectContext(object):
+    """Resolved project: config, changelog path, settings and VCS backend.
+
+    Contexts are memoized for the process by config path and by the start
+    directory of the config discovery, so the config is found and read and
+    the backend is created once however many times it is resolved.
+    """
+
+    _instances = {}  # config path or start directory -> ProjectContext
+
+    def __init__(self, config_path):
+        """
+        :param config_path: str: path to config
+        """
+        self.config_path = op.abspath(config_path)
+        self.root = op.dirname(self.config_path)
+        self.config = get_config(path=self.config_path)
+        self.settings = self.config['md-changelog']
+        # Relative changelog path is relative to the config directory
+        self.changelog_path = op.normpath(
+            op.join(self.root, self.settings['changelog']))
+        self.mode = self.settings.get('mode', MODE_LIST)
+        if self.mode not in MODES:
+            raise ChangelogError('Unsupported mode: %s' % self.mode)
+        self._vcs = None
+        self.journal = journal.Journal(
+            self.changelog_path,
+            size=self.settings.getint('undo_size', journal.DEFAULT_SIZE))
+        self._renderers = {}
+
+    @classmethod
+    def resolve(cls, config_path=None, start=None):
+        """Get memoized project context
+
+        :param config_path: str: path to config, discovered upwards from the
+            start directory if not passed
+        :param start: str: directory to start discovery from, the current
+            one by default
+        :return: ProjectContext instance
+        """
+        if config_path is not None:
+            key = op.abspath(config_path)
+        else:
+            key = op.abspath(start or os.getcwd())
+        context = cls._instances.get(key)
+        if context is None:
+            path = key if config_path is not None else find_config(key)
+            context = cls._instances.get(path) or cls(path)
+            cls._instances[key] = cls._instances[path] = context
+        return context
+
+    @classmethod
+    def clear(cls):
+        """Forget memoized contexts, e.g after config is changed"""
+        cls._instances.clear()
+
+    @property
+    def project(self):
+        """Project name: 'project' config option or config directory name"""
+        return self.settings.get('project', op.basename(self.root))
+
+    @property
+    def vcs(self):
+        """VCS backend of the changelog directory
+
+        :return: md_changelog.utils.VcsBackend instance
+        """
+        if self._vcs is None:
+            name = self.settings.get('vcs', DEFAULT_VCS)
+            try:
+                backend = VCS_BACKENDS[name]
+            except KeyError:
+                raise ChangelogError('Unsupported vcs: %s' % name)
+            self._vcs = backend(path=op.dirname(self.changelog_path))
+        return self._vcs
+
+    @property
+    def author(self):
+        """Default message author: VCS user name if 'authors' config option
+        is enabled, otherwise None
+        """
+        if not self.settings.getboolean('authors', False):
+            return None
+        return self.vcs.get_user_name()
+
+    def renderer(self, preset=None):
+        """Output renderer of the config [templates] section, templates are
+        compiled once
+
+        :param preset: str: built-in preset overriding the config templates
+        :return: md_changelog.templates.Renderer instance
+        """
+        renderer = self._renderers.get(preset)
+        if renderer is None:
+            section = None
+            if self.config.has_section('templates'):
+                # Templates are read raw: '%' is a literal, e.g 'width:100%'
+                section = dict(self.config.items('templates', raw=True))
+            renderer = Renderer.from_config(section, preset=preset)
+            self._renderers[preset] = renderer
+        return renderer
+
+    def tag_name(self, version):
+        """Get VCS tag name of the version by 'tag_format' config option
+
+        :param version: Version instance
+        :return: str
+        """
+        tag_format = self.settings.get('tag_format', DEFAULT_TAG_FORMAT)
+        return tag_format.format(version=version)
+
+    def changelog(self):
+        """Parse changelog
+
+        :return: md_changelog.entry.Changelog instance
+        """
+        return Changelog.parse(path=self.changelog_path, mode=self.mode)
+
+    def transaction(self, operation=None):
+        """Changelog transaction, see Changelog.transaction()
+
+        :param operation: str: operation name, changes are recorded to the
+            undo journal if passed
+        :return: context manager of md_changelog.entry.Changelog instance
+        """
+        on_save = None
+        if operation:
+            on_save = functools.partial(self.journal.record, operation)
+        return Changelog.transaction(self.changelog_path, mode=self.mode,
+                                     on_save=on_save)
+
+
 def get_changelog(config_path):
     """Changelog getter
 
-    :param config_path: str: path to config 
+    :param config_path: str: path to config, discovered if None
     :return: md_changelog.entry.Changelog instance
     """
-    config = get_config(path=config_path)
-    changelog_path = config['md-changelog']['changelog']
-    return Changelog.parse(path=changelog_path)
+    return ProjectContext.resolve(config_path=config_path).changelog()
+
+
+def create_tag(vcs, name, version, path):
+    """Create release tag for the current revision. The changelog must be
+    committed, otherwise the tagged revision doesn't contain the release
+
+    :param vcs: VcsBackend instance
+    :param name: str: tag name
+    :param version: Version instance
+    :param path: str: changelog path
+    :return: bool: True if the tag is created
+    """
+    try:
+        if vcs.is_modified(path):
+            logger.warning(
+                "WARNING: can't create tag %s, %s has uncommitted changes. "
+                "Commit it and run 'md-changelog tags --create'",
+                name, op.basename(path))
+            return False
+        vcs.create_tag(name, message='Release %s' % version)
+    except subprocess.CalledProcessError:
+        logger.warning("WARNING: can't create tag %s", name)
+        return False
+    logger.info('Created tag %s', name)
+    return True
 
 
 def get_input(text):
@@ -129,50 +334,104 @@ def get_input(text):
     return input(text)
 
 
-def release(args):
+def edit_entry(entry, name=CHANGELOG_NAME, mode=MODE_LIST):
+    """Open a single log entry in the editor instead of the whole changelog
+
+    :param entry: LogEntry instance
+    :param name: str: temp file name suffix, e.g changelog file name
+    :param mode: str: rendering mode, one of md_changelog.entry.MODES
+    :return: LogEntry instance parsed from the edited text
+    """
+    fd, path = tempfile.mkstemp(prefix='md-changelog-', suffix='-' + name)
+    try:
+        with os.fdopen(fd, 'w') as tmp:
+            tmp.write(entry.eval(mode=mode) + '\n')
+        subprocess.call([default_editor(), path])
+        with open(path) as tmp:
+            text = tmp.read()
+    finally:
+        os.remove(path)
+
+    entries = Changelog.parse_entries(text=text)
+    if len(entries) != 1:
+        raise ChangelogError(
+            'Expected exactly one log entry after editing, got %d'
+            % len(entries))
+    return entries[0]
+
+
+@handler
+def release(args, context):
     """Make a new release
 
     :param args: command-line args
+    :param context: ProjectContext instance
     """
+    if args.tag:
+        # The release is committed before tagging, so other changes of the
+        # changelog must not get into the release commit
+        try:
+            modified = context.vcs.is_modified(context.changelog_path)
+        except subprocess.CalledProcessError:
+            logger.info("Can't get VCS status of %s, the release tag can't "
+                        "be created", context.changelog_path)
+            sys.exit(99)
+        if modified:
+            logger.info('%s has uncommitted changes. Commit them before '
+                        'the release with --tag',
+                        op.basename(context.changelog_path))
+            sys.exit(99)
 
-    changelog = get_changelog(args.config)
-    last_entry = changelog.last_entry
-    if not last_entry:
-        logger.info('Empty changelog. Nothing to release')
-        sys.exit(99)
-
-    if last_entry.version.released:
-        logger.info("No UNRELEASED entries. Run 'md-changelog append'")
-        sys.exit(99)
-
-    if args.version:
-        # Set up specific version
-        v = tokens.Version(args.version)
-        last_v = last_entry.version
-        if v <= last_v:
-            logger.info('Version must be greater than the last one: '
-                        '%s <= %s (last one)', v, last_v)
+    # Changes are written once on exit, nothing is written if the release is
+    # discarded
+    with context.transaction(operation='release') as changelog:
+        last_entry = changelog.last_entry
+        if not last_entry:
+            logger.info('Empty changelog. Nothing to release')
             sys.exit(99)
-        else:
-            last_entry.set_version(v)
 
-    # Backup before release
-    changelog.make_backup()
+        if last_entry.version.released:
+            logger.info("No UNRELEASED entries. Run 'md-changelog append'")
+            sys.exit(99)
 
-    last_entry.set_date(tokens.Date())
-    changelog.save()
+        if args.version or args.bump:
+            # Set up specific or computed version
+            if args.bump:
+                part = None if args.bump == 'auto' else args.bump
+                v = changelog.next_version(part=part)
+                logger.info('Bump version: %s -> %s', last_entry.version, v)
+            else:
+                try:
+                    v = tokens.Version(args.version)
+                except ValueError as err:
+                    logger.info(str(err))
+                    sys.exit(99)
+            last_v = last_entry.version
+            if v <= last_v:
+                logger.info('Version must be greater than the last one: '
+                            '%s <= %s (last one)', v, last_v)
+                sys.exit(99)
+            else:
+                last_entry.set_version(v)
+
+        last_entry.set_date(tokens.Date())
+
+        # Skip this step if --force-yes is passed. Only the released entry
+        # is edited, the file is not touched until changes are confirmed
+        if not args.force_yes:
+            try:
+                edited = edit_entry(last_entry,
+                                    name=op.basename(changelog.path),
+                                    mode=changelog.mode)
+            except ChangelogError as err:
+                logger.info('%s. Discard changes', err)
+                sys.exit(99)
+            confirm = get_input('Confirm changes? [Y/n]')
+            if confirm == 'n':
+                logger.info('Discard changes')
+                sys.exit(0)
+            changelog.entries[-1] = edited
 
-    # Skip this step if --force-yes is passed
-    if not args.force_yes:
-        subprocess.call([default_editor(), changelog.path])
-        confirm = get_input('Confirm changes? [Y/n]')
-        if confirm == 'n':
-            res = changelog.undo()
-            logger.info('Undo changes: %s', 'OK' if res else 'Fail')
-            changelog.save()
-            sys.exit(0)
-
-    changelog.reload()
     if not changelog.last_entry.version.released:
         logger.warning(
             "WARNING: version still contains dev suffix: %s. "
@@ -189,71 +448,493 @@ def release(args):
                 "Run 'md-changelog edit' to fix it",
                 v_cur, v_prev)
 
-
-def append_entry(args):
+    if args.tag:
+        version = changelog.last_entry.version
+        if not version.released:
+            logger.warning("WARNING: tag of the unreleased version %s is "
+                           "not created", version)
+            return
+        try:
+            context.vcs.commit(changelog.path, 'Release %s' % version)
+        except subprocess.CalledProcessError:
+            logger.warning("WARNING: can't commit %s, tag is not created",
+                           op.basename(changelog.path))
+            return
+        create_tag(context.vcs, context.tag_name(version), version,
+                   changelog.path)
+
+
+@handler
+def append_entry(args, context):
     """Append new changelog entry
 
     :param args: command-line args
+    :param context: ProjectContext instance
     """
-    changelog = get_changelog(args.config)
-    last_entry = changelog.last_entry
-    if last_entry and not last_entry.version.released:
-        logger.info('Changelog has contained UNRELEASED entry. '
-                    'Make a release before appending a new one')
-        sys.exit(99)
-    changelog.new_entry()
-    changelog.save()
+    with context.transaction(operation='append') as changelog:
+        last_entry = changelog.last_entry
+        if last_entry and not last_entry.version.released:
+            logger.info('Changelog has contained UNRELEASED entry. '
+                        'Make a release before appending a new one')
+            sys.exit(99)
+        changelog.new_entry()
     if not args.no_edit:
         subprocess.call([default_editor(), changelog.path])
     logger.info("Added new '%s' entry", changelog.last_entry.header)
 
 
-def edit(args):
+@handler
+def edit(args, context):
     """Open changelog in the editor"""
-    config = get_config(path=args.config)
-    changelog_path = config['md-changelog']['changelog']
+    changelog_path = context.changelog_path
     editor = default_editor()
     logger.info('Call: %s %s', editor, changelog_path)
     subprocess.call([editor, changelog_path])
 
 
-def add_message(args):
+def unreleased_entry(changelog):
+    """Get unreleased entry, a new one is created if there is no such entry
+
+    :param changelog: Changelog instance
+    :return: LogEntry instance
+    """
+    if not changelog.last_entry or changelog.last_entry.version.released:
+        return changelog.new_entry()
+    return changelog.last_entry
+
+
+@handler
+def add_message(args, context):
     """Add message to unreleased
 
     :param args: command-line args
+    :param context: ProjectContext instance
     """
-    changelog = get_changelog(args.config)
-    m_type = getattr(tokens.TYPES, args.message_type)
+    m_type = tokens.MESSAGE_TYPES[args.message_type]
+    author = args.author or context.author
     messages = []
     if args.split_by:
-        messages = [tokens.Message(text=msg.strip(), message_type=m_type)
+        messages = [tokens.Message(text=msg.strip(), message_type=m_type,
+                                   author=author)
                     for msg in args.message.split(args.split_by)]
     else:
-        messages.append(tokens.Message(text=args.message, message_type=m_type))
+        messages.append(tokens.Message(text=args.message, message_type=m_type,
+                                       author=author))
 
-    if not changelog.last_entry or changelog.last_entry.version.released:
-        new_entry = changelog.new_entry()
-        for msg in messages:
-            new_entry.add_message(msg)
-    else:
+    with context.transaction(operation=args.message_type) as changelog:
+        # History index is built before the new entry is created, the entry
+        # itself is checked by LogEntry.add_message
+        history = changelog.message_index() if args.dedupe == 'all' \
+            else set()
+        entry = unreleased_entry(changelog)
+
+        added = 0
         for msg in messages:
-            changelog.last_entry.add_message(msg)
-    changelog.save()
+            if msg.normalized_key in history:
+                continue
+            added += entry.add_message(msg, dedupe=bool(args.dedupe))
+
+        if added < len(messages):
+            logger.info('Skip %d duplicate %s message(s)',
+                        len(messages) - added, args.message_type)
+            if not added:
+                # Nothing is changed, the file is not written
+                return
 
     logger.info('Added new %d %s entry to the %s (%s)',
-                len(messages),
+                added,
                 args.message_type,
                 op.relpath(changelog.path),
                 str(changelog.last_entry.version))
 
 
-def show_last(args):
+def default_revisions(context, changelog):
+    """Revision range of commits since the latest release: from the release
+    tag if it exists, otherwise the whole history
+
+    :param context: ProjectContext instance
+    :param changelog: Changelog instance
+    :return: str
+    """
+    latest = next((entry for entry in reversed(changelog.entries)
+                   if entry.released), None)
+    if latest is not None:
+        name = context.tag_name(latest.version)
+        if name in context.vcs.get_tags():
+            return '%s..HEAD' % name
+    return 'HEAD'
+
+
+@handler
+def import_commits(args, context):
+    """Import VCS commit subjects as messages of the unreleased entry.
+    Commits and their authors are read with a single VCS call, messages which
+    are already in the entry are skipped
+
+    :param args: command-line args
+    :param context: ProjectContext instance
+    """
+    with context.transaction(operation='import') as changelog:
+        revisions = args.revisions or default_revisions(context, changelog)
+        try:
+            commits = context.vcs.get_log(revisions)
+        except subprocess.CalledProcessError:
+            logger.info("Can't read VCS log of %s", revisions)
+            sys.exit(99)
+
+        authors = context.settings.getboolean('authors', False)
+        entry = unreleased_entry(changelog)
+        added = 0
+        for author, subject in commits:
+            message = tokens.Message.from_commit(
+                subject, author=author if authors else None)
+            if message is None or args.typed_only and not message.type:
+                continue
+            added += entry.add_message(message, dedupe=True)
+    logger.info('Imported %d message(s) of %d commit(s) from %s',
+                added, len(commits), revisions)
+
+
+@handler
+def auto_message(args, context):
+    """Add message parsed from VCS commit message, e.g in post-commit hook
+
+    :param args: command-line args
+    :param context: ProjectContext instance
+    """
+    message = tokens.Message.from_commit(
+        args.message, author=args.author or context.author)
+    if message is None or args.typed_only and not message.type:
+        logger.info('Skip commit message')
+        return
+
+    with context.transaction(operation='auto-message') as changelog:
+        entry = unreleased_entry(changelog)
+        if not entry.add_message(message, dedupe=True):
+            logger.info('Skip duplicate message')
+            return
+    logger.info("Added new message '%s' to the %s (%s)", message.eval(),
+                op.relpath(changelog.path), str(changelog.last_entry.version))
+
+
+@handler
+def undo(args, context):
+    """Undo the last recorded operations
+
+    :param args: command-line args
+    :param context: ProjectContext instance
+    """
+    try:
+        undone = context.journal.undo(count=args.n)
+    except ChangelogError as err:
+        logger.info(str(err))
+        sys.exit(99)
+    if not undone:
+        logger.info('Nothing to undo')
+        sys.exit(99)
+    for record in undone:
+        logger.info("Undo '%s' of %s: %s", record['operation'],
+                    record['time'], context.journal.describe(record))
+    if op.exists(completion.get_cache_path(context.changelog_path)):
+        # The changelog is parsed only if completion cache is enabled
+        completion.write_cache(context.changelog())
+
+
+@handler
+def history(args, context):
+    """Show recorded operations which can be undone, the latest one goes
+    first
+
+    :param args: command-line args
+    :param context: ProjectContext instance
+    """
+    records = context.journal.records()[::-1]
+    if args.n:
+        records = records[:args.n]
+    for number, record in enumerate(records, 1):
+        print('{:<4}{:<21}{:<16}{}'.format(number, record['time'],
+                                           record['operation'],
+                                           context.journal.describe(record)))
+
+
+@handler
+def show_last(args, context):
     """Show the last changelog log entry
 
     :param args: command-line args
+    :param context: ProjectContext instance
     """
-    changelog = get_changelog(args.config)
-    print('\n%s\n' % changelog.last_entry.eval())
+    changelog = context.changelog()
+    print('\n%s\n' % changelog.last_entry.eval(
+        mode=args.mode or changelog.mode))
+
+
+@handler
+def show(args, context):
+    """Show changelog entries, the newest one goes first
+
+    :param args: command-line args
+    :param context: ProjectContext instance
+    """
+    changelog = context.changelog()
+    try:
+        since = tokens.Version(args.since) if args.since else None
+        until = tokens.Version(args.until) if args.until else None
+    except ValueError as err:
+        logger.info(str(err))
+        sys.exit(99)
+    mode = args.mode or changelog.mode
+    for entry in reversed(changelog.entries):
+        if since and entry.version < since or \
+                until and entry.version > until:
+            continue
+        print('\n%s' % entry.eval(mode=mode))
+    print()
+
+
+@handler
+def render(args, context):
+    """Render changelog with output templates
+
+    :param args: command-line args
+    :param context: ProjectContext instance
+    """
+    try:
+        since = tokens.Version(args.since) if args.since else None
+        until = tokens.Version(args.until) if args.until else None
+        renderer = context.renderer(preset=args.preset)
+    except (ValueError, ChangelogError) as err:
+        logger.info(str(err))
+        sys.exit(99)
+    changelog = context.changelog()
+    entries = [entry for entry in reversed(changelog.entries)
+               if not (since and entry.version < since or
+                       until and entry.version > until)]
+    output = renderer.render(entries)
+    if args.out:
+        cache.atomic_write(args.out, output)
+        logger.info('Rendered %d entries to %s', len(entries), args.out)
+    else:
+        sys.stdout.write(output)
+
+
+@handler
+def show_stats(args, context):
+    """Show changelog stats: message counts per type per release, messages
+    per release and release cadence
+
+    :param args: command-line args
+    :param context: ProjectContext instance
+    """
+    try:
+        result = stats.changelog_stats(context.changelog_path,
+                                       since=args.since,
+                                       until=args.until)
+    except ValueError as err:
+        logger.info(str(err))
+        sys.exit(99)
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+
+    names = list(tokens.MESSAGE_TYPES)
+    row = '{:<16}{:<12}{:>8}' + '{:>13}' * len(names)
+    print(row.format('Version', 'Date', 'Total', *names))
+    for item in reversed(result['releases']):
+        print(row.format(item['version'], item['date'], item['messages'],
+                         *[item['types'].get(name, 0) for name in names]))
+
+    cadence = result['cadence']
+    print('\nReleases: %d, messages: %d, messages per release: %.1f'
+          % (len(result['releases']), result['messages'],
+             result['messages_per_release']))
+    if cadence['mean_days'] is not None:
+        print('Release cadence (days): mean %.1f, median %.1f, min %d, max %d'
+              % (cadence['mean_days'], cadence['median_days'],
+                 cadence['min_days'], cadence['max_days']))
+    if result['unreleased']:
+        print('Unreleased messages: %d' % result['unreleased']['messages'])
+
+
+@handler
+def tags(args, context):
+    """Verify that every released version has a VCS tag. All the tags are
+    read at once and matched in memory
+
+    :param args: command-line args
+    :param context: ProjectContext instance
+    """
+    changelog = context.changelog()
+    vcs = context.vcs
+    existing = vcs.get_tags()
+
+    missing = []
+    for entry in reversed(changelog.entries):
+        if not entry.released:
+            continue
+        name = context.tag_name(entry.version)
+        tag_date = existing.get(name)
+        if tag_date is None:
+            missing.append((entry, name))
+            status = '%s (missing)' % name
+        else:
+            status = '%s (%s)' % (name, tag_date)
+        print('{:<16}{:<12}{}'.format(str(entry.version), entry.date.eval(),
+                                      status))
+
+    if missing and args.create:
+        # Tag is created for the current revision, so only the latest
+        # release can be tagged automatically
+        latest = next((entry for entry in reversed(changelog.entries)
+                       if entry.released), None)
+        entry, name = missing[0]
+        if entry is latest and create_tag(vcs, name, entry.version,
+                                          changelog.path):
+            missing.pop(0)
+        for entry, name in missing:
+            logger.info('Tag %s must be created manually: '
+                        'git tag -a %s <commit>', name, name)
+    if missing:
+        sys.exit(99)
+
+
+@handler
+def watch(args, context):
+    """Watch changelog and regenerate derived outputs on change
+
+    :param args: command-line args
+    :param context: ProjectContext instance
+    """
+    changelog_path = context.changelog_path
+    out_dir = args.out or op.join(op.dirname(changelog_path),
+                                  'release-notes')
+    watcher = Watcher(changelog_path, out_dir=out_dir,
+                      interval=args.interval, debounce=args.debounce)
+    if not args.once:
+        logger.info('Watching %s, press Ctrl+C to stop', changelog_path)
+    try:
+        watcher.run(once=args.once)
+    except KeyboardInterrupt:
+        pass
+
+
+def aggregate_changelogs(args):
+    """Print merged timeline of many project changelogs ordered by release
+    date
+
+    :param args: command-line args
+    """
+    sources = []
+    for cfg_path in args.configs:
+        # Broken project, e.g its message types conflict with the ones of
+        # other projects, doesn't stop aggregation of the rest
+        try:
+            context = ProjectContext.resolve(config_path=cfg_path)
+        except ChangelogError as err:
+            logger.warning('WARNING: skip %s: %s', cfg_path, err)
+            continue
+        sources.append((context.project, context.changelog_path))
+
+    since = tokens.Date(args.since).dt if args.since else None
+    timeline = aggregate.iter_timeline(sources, since=since)
+    if args.limit:
+        timeline = itertools.islice(timeline, args.limit)
+
+    print('Changelog\n=========\n')
+    try:
+        for project, entry in timeline:
+            print('%s\n' % aggregate.render_entry(project, entry))
+    except ChangelogError as err:
+        logger.info(str(err))
+        sys.exit(99)
+
+
+@handler
+def publish(args, context):
+    """Publish static release notes site and Atom feed
+
+    :param args: command-line args
+    :param context: ProjectContext instance
+    """
+    changelog = context.changelog()
+    title = args.title or context.project
+    publisher = Publisher(args.out, title=title, base_url=args.base_url,
+                          feed_size=args.feed_size)
+    written = publisher.publish(changelog)
+    logger.info('Published %d file(s) to %s', len(written), args.out)
+
+
+def print_completion(args):
+    """Print bash completion script and enable completion cache
+
+    :param args: command-line args
+    """
+    try:
+        context = ProjectContext.resolve(config_path=args.config)
+        completion.write_cache(context.changelog())
+    except ConfigNotFoundError:
+        logger.info('Config is not found, versions are not completed')
+    print(completion.bash_script(create_parser(), VERSION_OPTIONS,
+                                 config_name=CONFIG_NAME))
+
+
+def load_revision(source, changelog, vcs):
+    """Load changelog from a file path or from a VCS revision of the
+    current changelog file
+
+    :param source: str: file path or VCS revision
+    :param changelog: Changelog instance: current changelog
+    :param vcs: VcsBackend instance
+    :return: Changelog instance
+    """
+    if op.isfile(source):
+        return Changelog.parse(path=source)
+    try:
+        text = vcs.show_file(rev=source, path=changelog.path)
+    except subprocess.CalledProcessError:
+        raise ChangelogError("Can't find file or revision '%s' of %s"
+                             % (source, changelog.path))
+    return Changelog.from_text(text=text, path=changelog.path)
+
+
+@handler
+def show_diff(args, context):
+    """Show entry-level diff between two changelog revisions
+
+    :param args: command-line args
+    :param context: ProjectContext instance
+    """
+    changelog = context.changelog()
+    vcs = context.vcs
+    try:
+        old = load_revision(args.source, changelog, vcs)
+        new = load_revision(args.target, changelog, vcs) \
+            if args.target else changelog
+    except ChangelogError as err:
+        logger.info(str(err))
+        sys.exit(99)
+
+    diff = old.diff(new)
+    if not any(diff):
+        logger.info('No changes')
+        return
+
+    for entry in diff.removed:
+        print('- %s' % entry.header)
+    for entry in diff.added:
+        print('+ %s' % entry.header)
+        for msg in entry.messages:
+            print('    + * %s' % msg.eval())
+    for change in diff.changed:
+        if change.old.header != change.new.header:
+            print('~ %s -> %s' % (change.old.header, change.new.header))
+        else:
+            print('~ %s' % change.new.header)
+        for msg in change.removed:
+            print('    - * %s' % msg.eval())
+        for msg in change.added:
+            print('    + * %s' % msg.eval())
 
 
 def create_parser():
@@ -270,9 +951,18 @@ def create_parser():
 
     release_p = subparsers.add_parser(
         'release', help='Release current version')
-    release_p.add_argument('-v', '--version', help='New release version')
+    version_group = release_p.add_mutually_exclusive_group()
+    version_group.add_argument('-v', '--version', help='New release version')
+    version_group.add_argument(
+        '--bump', choices=tokens.Version.BUMP_PARTS + ('auto', ),
+        help="Bump version part; 'auto' bumps major for [Breaking], "
+             "minor for [Feature] messages, otherwise patch")
     release_p.add_argument('-y', '--force-yes', action='store_true',
                            help="Don't ask changes confirmation")
+    release_p.add_argument('--tag', action='store_true',
+                           help='Commit the changelog and create VCS tag of '
+                                'the release. The changelog must have no '
+                                'uncommitted changes before the release')
     release_p.set_defaults(func=release)
 
     append_p = subparsers.add_parser(
@@ -281,27 +971,172 @@ def create_parser():
                           action='store_true')
     append_p.set_defaults(func=append_entry)
 
-    # Message parsers
-    for m_type in list(tokens.TYPES._asdict().keys()):
+    # Open in an editor command
+    edit_p = subparsers.add_parser('edit', help='Open changelog in the editor')
+    edit_p.set_defaults(func=edit)
+
+    last_p = subparsers.add_parser('last', help='Show last log entry')
+    last_p.add_argument('--mode', choices=MODES,
+                        help='Messages order: list as is or group by type, '
+                             'config mode by default')
+    last_p.set_defaults(func=show_last)
+
+    show_p = subparsers.add_parser('show', help='Show log entries')
+    show_p.add_argument('--since', help='The first version, inclusive')
+    show_p.add_argument('--until', help='The last version, inclusive')
+    show_p.add_argument('--mode', choices=MODES,
+                        help='Messages order: list as is or group by type, '
+                             'config mode by default')
+    show_p.set_defaults(func=show)
+
+    diff_p = subparsers.add_parser(
+        'diff', help='Show changed entries between two changelog revisions')
+    diff_p.add_argument('source', help='Changelog file path or VCS revision')
+    diff_p.add_argument('target', nargs='?',
+                        help='Changelog file path or VCS revision to compare '
+                             'with (default: current changelog)')
+    diff_p.set_defaults(func=show_diff)
+
+    render_p = subparsers.add_parser(
+        'render', help='Render changelog with output templates of the '
+                       'config [templates] section')
+    render_p.add_argument('--preset', choices=sorted(PRESETS),
+                          help='Use built-in templates preset instead of '
+                               'the config ones')
+    render_p.add_argument('--since', help='The first version, inclusive')
+    render_p.add_argument('--until', help='The last version, inclusive')
+    render_p.add_argument('-o', '--out', help='Output file, stdout by '
+                                              'default')
+    render_p.set_defaults(func=render)
+
+    stats_p = subparsers.add_parser(
+        'stats', help='Show message counts per release and release cadence')
+    stats_p.add_argument('--since', help='The first version, inclusive')
+    stats_p.add_argument('--until', help='The last version, inclusive')
+    stats_p.add_argument('--json', action='store_true',
+                         help='Print stats as json')
+    stats_p.set_defaults(func=show_stats)
+
+    tags_p = subparsers.add_parser(
+        'tags', help='Check that every released version has a VCS tag')
+    tags_p.add_argument('--create', action='store_true',
+                        help='Create missing tag of the latest release')
+    tags_p.set_defaults(func=tags)
+
+    watch_p = subparsers.add_parser(
+        'watch', help='Watch changelog and regenerate json export, release '
+                      'notes and the latest entry snippet on change')
+    watch_p.add_argument('--out', help='Output directory, default is '
+                                       'release-notes next to the changelog')
+    watch_p.add_argument('--interval', type=float, default=1.0,
+                         help='Polling interval in seconds')
+    watch_p.add_argument('--debounce', type=float, default=0.5,
+                         help='Wait until the file is not changed for this '
+                              'time in seconds before update')
+    watch_p.add_argument('--once', action='store_true',
+                         help='Update outputs once and exit')
+    watch_p.set_defaults(func=watch)
+
+    aggregate_p = subparsers.add_parser(
+        'aggregate', help='Merge changelogs of many projects into one '
+                          'timeline ordered by release date')
+    aggregate_p.add_argument('configs', nargs='+', metavar='CONFIG',
+                             help='Project config paths')
+    aggregate_p.add_argument('--since', help='Skip releases older than this '
+                                             'date, YYYY-MM-DD')
+    aggregate_p.add_argument('--limit', type=int,
+                             help='Max number of releases')
+    aggregate_p.set_defaults(func=aggregate_changelogs)
+
+    publish_p = subparsers.add_parser(
+        'publish', help='Publish static release notes site and Atom feed')
+    publish_p.add_argument('--out', required=True, help='Output directory')
+    publish_p.add_argument('--title', help='Site title, project name by '
+                                           'default')
+    publish_p.add_argument('--base-url', default='',
+                           help='Site url for the feed links')
+    publish_p.add_argument('--feed-size', type=int, default=20,
+                           help='Number of the latest releases in the feed')
+    publish_p.set_defaults(func=publish)
+
+    import_p = subparsers.add_parser(
+        'import', help='Import VCS commit subjects as unreleased messages')
+    import_p.add_argument('revisions', nargs='?',
+                          help='Revision range, e.g v0.1.0..HEAD (default: '
+                               'since the latest release tag)')
+    import_p.add_argument('--typed-only', action='store_true',
+                          help='Skip commits without type prefix, e.g '
+                               "'feat:' or '[Feature]'")
+    import_p.set_defaults(func=import_commits)
+
+    auto_p = subparsers.add_parser(
+        'auto-message', help='Add message parsed from commit message, e.g '
+                             'in post-commit hook')
+    auto_p.add_argument('message', help='Commit message')
+    auto_p.add_argument('--author', help='Message author, VCS user name if '
+                                         "'authors' config option is set")
+    auto_p.add_argument('--typed-only', action='store_true',
+                        help='Skip commit without type prefix, e.g '
+                             "'feat:' or '[Feature]'")
+    auto_p.set_defaults(func=auto_message)
+
+    undo_p = subparsers.add_parser(
+        'undo', help='Undo the last changelog operations, see history')
+    undo_p.add_argument('-n', type=int, default=1,
+                        help='Number of operations to undo')
+    undo_p.set_defaults(func=undo)
+
+    history_p = subparsers.add_parser(
+        'history', help='Show recorded operations which can be undone')
+    history_p.add_argument('-n', type=int,
+                           help='Number of the latest operations to show')
+    history_p.set_defaults(func=history)
+
+    completion_p = subparsers.add_parser(
+        'completion', help='Print bash completion script, usage: '
+                           'eval "$(md-changelog completion)"')
+    completion_p.set_defaults(func=print_completion)
+
+    # Message parsers, including custom types registered from config
+    for m_type in tokens.MESSAGE_TYPES:
+        if m_type in subparsers.choices:
+            logger.warning('WARNING: message type %s conflicts with the '
+                           'command of the same name. Skip', m_type)
+            continue
         msg_p = subparsers.add_parser(
             m_type, help='Add new %s entry to the current release' % m_type)
         msg_p.add_argument('message', help='Enter text message here')
+        msg_p.add_argument('--author',
+                           help="Message author, VCS user name if 'authors' "
+                                'config option is set')
         msg_p.add_argument('--split-by', type=str,
                            help='Split message into several and add it as '
                                 'multiple entries')
+        msg_p.add_argument('--dedupe', action='store_const', const='entry',
+                           help='Skip messages that are already in the '
+                                'unreleased entry')
+        msg_p.add_argument('--dedupe-all', action='store_const', const='all',
+                           dest='dedupe',
+                           help='Skip messages that are already in the '
+                                'whole changelog')
         msg_p.set_defaults(func=add_message, message_type=m_type)
 
-    # Open in an editor command
-    edit_p = subparsers.add_parser('edit', help='Open changelog in the editor')
-    edit_p.set_defaults(func=edit)
-
-    last_p = subparsers.add_parser('last', help='Show last log entry')
-    last_p.set_defaults(func=show_last)
-
     return parser
 
 
 def main():
+    # Load config before the parser is created to register custom types
+    pre_parser = argparse.ArgumentParser(add_help=False)
+    pre_parser.add_argument('-c', '--config')
+    known_args, _ = pre_parser.parse_known_args()
+    try:
+        ProjectContext.resolve(config_path=known_args.config)
+    except ConfigNotFoundError:
+        pass
+    except ChangelogError as err:
+        logger.info(str(err))
+        sys.exit(99)
+
     parser = create_parser()
     args = parser.parse_args()
     args.func(args)
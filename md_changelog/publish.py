@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import os
+import os.path as op
+from html import escape
+
+from md_changelog import cache
+
+PAGE_TEMPLATE = '''<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<link rel="alternate" type="application/atom+xml" href="feed.xml">
+</head>
+<body>
+{body}
+</body>
+</html>
+'''
+
+FEED_TEMPLATE = '''<?xml version="1.0" encoding="utf-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+<title>{title}</title>
+<id>{id}</id>
+<link href="{link}"/>
+<updated>{updated}</updated>
+{entries}
+</feed>
+'''
+
+FEED_ENTRY_TEMPLATE = '''<entry>
+<title>{title}</title>
+<id>{id}</id>
+<link href="{link}"/>
+<updated>{updated}</updated>
+<content type="html">{content}</content>
+</entry>'''
+
+
+class Publisher(object):
+    """Static release notes site publisher: one page per release, index page
+    and Atom feed of the latest releases.
+
+    Build manifest keeps content hashes of the published entries, so only new
+    or changed entries are rendered and written on later runs.
+    """
+
+    MANIFEST_NAME = '.manifest.json'
+    MANIFEST_VERSION = 2
+
+    def __init__(self, out_dir, title='Changelog', base_url='', feed_size=20):
+        """
+        :param out_dir: str: output directory
+        :param title: str: site title
+        :param base_url: str: site url used for feed links
+        :param feed_size: int: number of the latest releases in the feed
+        """
+        self.out_dir = out_dir
+        self.title = title
+        self.base_url = base_url.rstrip('/')
+        self.feed_size = feed_size
+
+    @property
+    def manifest_path(self):
+        return op.join(self.out_dir, self.MANIFEST_NAME)
+
+    @staticmethod
+    def page_name(entry):
+        return '%s.html' % entry.version
+
+    def page_key(self, entry):
+        """Manifest key of the release page: entry content and the site
+        settings rendered on the page
+
+        :param entry: LogEntry instance
+        :return: str
+        """
+        return hashlib.sha1(repr([self.title, entry.digest]).encode(
+            'utf-8')).hexdigest()
+
+    @staticmethod
+    def render_body(entry):
+        """Render log entry html
+
+        :param entry: LogEntry instance
+        :return: str
+        """
+        items = []
+        for message in entry.messages:
+            text = escape(message.eval(typed=False))
+            if message.type:
+                items.append('<li><strong>[%s]</strong> %s</li>' % (
+                    escape(message.type), text))
+            else:
+                items.append('<li>%s</li>' % text)
+        return '<h2>%s</h2>\n<ul>\n%s\n</ul>' % (escape(entry.header),
+                                                 '\n'.join(items))
+
+    def render_page(self, entry):
+        body = '<p><a href="index.html">%s</a></p>\n%s' % (
+            escape(self.title), self.render_body(entry))
+        return PAGE_TEMPLATE.format(
+            title=escape('%s %s' % (self.title, entry.version)), body=body)
+
+    def render_index(self, entries):
+        items = ['<li><a href="%s">%s</a></li>' % (
+            escape(self.page_name(entry)), escape(entry.header))
+            for entry in entries]
+        body = '<h1>%s</h1>\n<ul>\n%s\n</ul>' % (escape(self.title),
+                                                 '\n'.join(items))
+        return PAGE_TEMPLATE.format(title=escape(self.title), body=body)
+
+    def render_feed(self, entries):
+        def link(name):
+            return escape('%s/%s' % (self.base_url, name))
+
+        def updated(entry):
+            return entry.date.dt.strftime('%Y-%m-%dT00:00:00Z')
+
+        items = [FEED_ENTRY_TEMPLATE.format(
+            title=escape('%s %s' % (self.title, entry.version)),
+            id=link(self.page_name(entry)),
+            link=link(self.page_name(entry)),
+            updated=updated(entry),
+            content=escape(self.render_body(entry)))
+            for entry in entries]
+        return FEED_TEMPLATE.format(
+            title=escape(self.title),
+            id=link('feed.xml'),
+            link=link('index.html'),
+            updated=updated(entries[0]) if entries else '',
+            entries='\n'.join(items))
+
+    def publish(self, changelog):
+        """Render and write changed pages of released entries, index and feed
+
+        :param changelog: Changelog instance
+        :return: list of written files paths
+        """
+        manifest = cache.load(self.manifest_path, default={})
+        if manifest.get('version') != self.MANIFEST_VERSION:
+            manifest = {}
+        published = manifest.get('entries', {})
+
+        releases = [entry for entry in reversed(changelog.entries)
+                    if entry.released]
+        digests = {}
+        written = []
+        os.makedirs(self.out_dir, exist_ok=True)
+        for entry in releases:
+            name = self.page_name(entry)
+            digests[name] = self.page_key(entry)
+            if published.get(name) != digests[name] or \
+                    not op.exists(op.join(self.out_dir, name)):
+                written.append(self._write(name, self.render_page(entry)))
+
+        for name in set(published) - set(digests):
+            path = op.join(self.out_dir, name)
+            if op.exists(path):
+                os.remove(path)
+
+        # Index and feed are re-rendered only if entries are changed
+        site_key = hashlib.sha1(repr(
+            [self.title, self.base_url, self.feed_size] +
+            [(self.page_name(entry), digests[self.page_name(entry)])
+             for entry in releases]).encode('utf-8')).hexdigest()
+        if manifest.get('site') != site_key:
+            written.append(self._write('index.html',
+                                       self.render_index(releases)))
+            written.append(self._write(
+                'feed.xml', self.render_feed(releases[:self.feed_size])))
+
+        cache.dump(self.manifest_path, {
+            'version': self.MANIFEST_VERSION,
+            'entries': digests,
+            'site': site_key,
+        })
+        return written
+
+    def _write(self, name, content):
+        path = op.join(self.out_dir, name)
+        cache.atomic_write(path, content)
+        return path
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import os
+
+from md_changelog import cache
+from md_changelog.entry import Changelog
+
+CACHE_NAME = 'stats.json'
+CACHE_VERSION = 1
+
+
+def collect(path, cache_file=None):
+    """Collect log entries stats of the changelog file.
+
+    Stats of released entries are cached along with the size and the hash of
+    the file tail they take. Released history is at the bottom of the file and
+    normally doesn't change, so repeated runs parse only new entries on top.
+
+    :param path: str: changelog path
+    :param cache_file: str: cache file path, next to the changelog by default
+    :return: tuple: (list of released entries stats, the oldest one goes
+        first; unreleased entry stats or None)
+    """
+    cache_file = cache_file or cache.cache_path(path, CACHE_NAME)
+    stat = os.stat(path)
+    stamp = [stat.st_size, stat.st_mtime_ns]
+    cached = cache.load(cache_file, default={})
+    if cached.get('version') != CACHE_VERSION:
+        cached = {}
+    if cached.get('stamp') == stamp:
+        return (cached['tail_releases'] + cached['head_releases'],
+                cached['unreleased'])
+
+    with open(path, 'rb') as fd:
+        data = fd.read()
+
+    tail_size = cached.get('tail_size', 0)
+    tail_releases = []
+    if cached and tail_size <= len(data):
+        tail_hash = hashlib.sha1(data[len(data) - tail_size:]).hexdigest()
+        if tail_hash == cached['tail_sha1']:
+            tail_releases = cached['tail_releases']
+    if not tail_releases:
+        tail_size = 0
+
+    # Walk new entries bottom-up, i.e from the oldest to the newest one
+    head = data[:len(data) - tail_size].decode('utf-8')
+    head_releases, unreleased = [], None
+    for block in reversed(Changelog.split_blocks(head)[1:]):
+        entry = Changelog.parse_entries(text=block)[0]
+        if entry.released and not head_releases and unreleased is None:
+            # Extend cached tail while released entries go contiguously
+            tail_releases.append(entry.stats())
+            tail_size += len(block.encode('utf-8'))
+        elif entry.released:
+            head_releases.append(entry.stats())
+        else:
+            unreleased = entry.stats()
+
+    tail_hash = hashlib.sha1(data[len(data) - tail_size:]).hexdigest()
+    cache.dump(cache_file, {
+        'version': CACHE_VERSION,
+        'stamp': stamp,
+        'tail_size': tail_size,
+        'tail_sha1': tail_hash,
+        'tail_releases': tail_releases,
+        'head_releases': head_releases,
+        'unreleased': unreleased,
+    })
+    return tail_releases + head_releases, unreleased
+
+
+def changelog_stats(path, since=None, until=None, cache_file=None):
+    """Changelog stats, see Changelog.stats()
+
+    :param path: str: changelog path
+    :param since: str: the first version of the range, inclusive
+    :param until: str: the last version of the range, inclusive
+    :param cache_file: str: cache file path, next to the changelog by default
+    :return: dict
+    """
+    releases, unreleased = collect(path, cache_file=cache_file)
+    return Changelog.summarize_stats(releases, unreleased=unreleased,
+                                     since=since, until=until)
@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+import string
+from operator import itemgetter
+from html import escape as html_escape
+
+from md_changelog.exceptions import ChangelogError
+
+# Template name -> field names available in the template
+FIELDS = {
+    'document': ('title', 'title_rule', 'entries'),
+    'entry': ('version', 'date', 'header', 'header_rule', 'messages'),
+    'message': ('type', 'label', 'text', 'author', 'by'),
+}
+
+# Output presets. Templates of the config [templates] section override them
+PRESETS = {
+    'markdown': {
+        'title': 'Changelog',
+        'document': '{title}\n{title_rule}\n\n{entries}\n\n',
+        'entry': '{header}\n{header_rule}\n{messages}',
+        'message': '* {label}{text}{by}',
+        'entry_separator': '\n\n',
+        'message_separator': '\n',
+        'escape': 'none',
+    },
+    'rst': {
+        'title': 'Changelog',
+        'document': '{title}\n{title_rule}\n\n{entries}\n',
+        'entry': '{header}\n{header_rule}\n\n{messages}',
+        'message': '* {label}{text}{by}',
+        'entry_separator': '\n\n',
+        'message_separator': '\n',
+        'escape': 'rst',
+    },
+    'html': {
+        'title': 'Changelog',
+        'document': '<h1>{title}</h1>\n{entries}\n',
+        'entry': '<h2>{header}</h2>\n<ul>\n{messages}\n</ul>',
+        'message': '<li>{label}{text}{by}</li>',
+        'entry_separator': '\n',
+        'message_separator': '\n',
+        'escape': 'html',
+    },
+    'text': {
+        'title': 'Changelog',
+        'document': '{title}\n\n{entries}\n',
+        'entry': '{header}\n{messages}',
+        'message': '  - {label}{text}{by}',
+        'entry_separator': '\n\n',
+        'message_separator': '\n',
+        'escape': 'none',
+    },
+}
+
+_RST_SPECIAL = '\\*`_|'  # backslash goes first
+
+
+def rst_escape(text):
+    # Chained replace is much faster than str.translate() on texts without
+    # special chars, which is the common case
+    for char in _RST_SPECIAL:
+        if char in text:
+            text = text.replace(char, '\\' + char)
+    return text
+
+
+ESCAPES = {
+    'none': None,
+    'html': lambda text: html_escape(text, quote=False),
+    'rst': rst_escape,
+}
+
+# Conversions of str.format() fields and printf-style equivalents
+_CONVERSIONS = {'s': (str, 's'), 'r': (repr, 'r'), 'a': (ascii, 'a')}
+
+
+def compile_template(name, source):
+    """Compile str.format() style template into a function taking template
+    fields as keyword arguments. The template is parsed and validated once
+    into a printf-style format string, so rendering is a single formatting
+    operation. Only fields with a format spec are formatted separately
+
+    :param name: str: template name, one of FIELDS
+    :param source: str: template, e.g '* {label}{text}'
+    :return: callable
+    """
+    fields = FIELDS[name]
+    fmt, args, formatted = [], [], []
+    try:
+        parsed = list(string.Formatter().parse(source))
+    except ValueError as err:
+        raise ChangelogError('Broken %s template %r: %s' % (name, source, err))
+    for literal, field, spec, conversion in parsed:
+        fmt.append(literal.replace('%', '%%'))
+        if field is None:
+            continue
+        if field not in fields:
+            raise ChangelogError(
+                'Unknown field {%s} of %s template, expected one of: %s'
+                % (field, name, ', '.join(fields)))
+        if conversion and conversion not in _CONVERSIONS:
+            raise ChangelogError(
+                'Unknown conversion !%s of %s template, expected one of: %s'
+                % (conversion, name, ', '.join(sorted(_CONVERSIONS))))
+        if spec and '{' in spec:
+            raise ChangelogError('Nested fields are not supported in %s '
+                                 'template %r' % (name, source))
+        convert, flag = _CONVERSIONS[conversion or 's']
+        if spec:
+            try:
+                format('', spec)
+            except ValueError as err:
+                raise ChangelogError('Wrong format spec %r of %s template: %s'
+                                     % (spec, name, err))
+            formatted.append((len(args), convert, spec))
+            flag = 's'
+        fmt.append('%' + flag)
+        args.append(field)
+    fmt = ''.join(fmt)
+
+    if not args:
+        text = fmt % ()
+        return lambda **values: text
+    # Field values are picked into the argument tuple at C speed
+    pick = itemgetter(*args) if len(args) > 1 else \
+        (lambda values: (values[args[0]], ))
+    if not formatted:
+        return lambda **values: fmt % pick(values)
+
+    def render(**values):
+        values = list(pick(values))
+        for index, convert, spec in formatted:
+            values[index] = format(convert(values[index]), spec)
+        return fmt % tuple(values)
+    return render
+
+
+def unescape(value):
+    """Unescape line breaks and tabs of the config value, e.g '\\n'"""
+    return value.replace('\\n', '\n').replace('\\t', '\t')
+
+
+class Renderer(object):
+    """Changelog renderer with templates compiled once at load time"""
+
+    def __init__(self, templates=None, preset='markdown'):
+        """
+        :param templates: dict: templates and settings overriding the preset
+            ones, see PRESETS
+        :param preset: str: one of PRESETS
+        """
+        if preset not in PRESETS:
+            raise ChangelogError('Unknown templates preset %r, expected one '
+                                 'of: %s' % (preset, ', '.join(PRESETS)))
+        settings = dict(PRESETS[preset])
+        for key, value in (templates or {}).items():
+            if key not in settings:
+                raise ChangelogError('Unknown template option: %s' % key)
+            settings[key] = value
+        if settings['escape'] not in ESCAPES:
+            raise ChangelogError('Unknown escape %r, expected one of: %s'
+                                 % (settings['escape'], ', '.join(ESCAPES)))
+
+        self.preset = preset
+        self.title = settings['title']
+        self.entry_separator = settings['entry_separator']
+        self.message_separator = settings['message_separator']
+        self.escape = ESCAPES[settings['escape']]
+        self._document = compile_template('document', settings['document'])
+        self._entry = compile_template('entry', settings['entry'])
+        self._message = compile_template('message', settings['message'])
+
+    @classmethod
+    def from_config(cls, section=None, preset=None):
+        """Create renderer from the config [templates] section, escaped line
+        breaks of the values are unescaped, e.g '\\n'
+
+        :param section: configparser.SectionProxy or dict
+        :param preset: str: preset overriding the config one. Templates of the
+            config are ignored in that case
+        :return: Renderer instance
+        """
+        section = dict(section or {})
+        config_preset = section.pop('preset', 'markdown')
+        if preset and preset != config_preset:
+            return cls(preset=preset)
+        return cls(templates={key: unescape(value)
+                              for key, value in section.items()},
+                   preset=config_preset)
+
+    def render_message(self, message):
+        m_type = message.type
+        text = message.text
+        author = message.author or ''
+        label = '[%s] ' % m_type if m_type else ''
+        by = ' (@%s)' % author if author else ''
+        escape = self.escape
+        if escape is not None:
+            m_type, text, author, label, by = (
+                escape(m_type), escape(text), escape(author), escape(label),
+                escape(by))
+        return self._message(type=m_type, label=label, text=text,
+                             author=author, by=by)
+
+    def render_entry(self, entry):
+        version = entry.version.eval()
+        date = entry.date.eval()
+        header = entry.header
+        header_rule = '-' * len(header)
+        escape = self.escape
+        if escape is not None:
+            version, date, header = escape(version), escape(date), \
+                escape(header)
+        render_message = self.render_message
+        return self._entry(
+            version=version, date=date, header=header,
+            header_rule=header_rule,
+            messages=self.message_separator.join(
+                [render_message(message) for message in entry.messages]))
+
+    def render(self, entries, title=None):
+        """Render log entries document
+
+        :param entries: iterable of LogEntry, in the output order
+        :param title: str: document title, the template one by default
+        :return: str
+        """
+        title = title or self.title
+        title_rule = '=' * len(title)
+        if self.escape is not None:
+            title = self.escape(title)
+        render_entry = self.render_entry
+        return self._document(
+            title=title,
+            title_rule=title_rule,
+            entries=self.entry_separator.join(
+                [render_entry(entry) for entry in entries]))
+
+    def render_changelog(self, changelog, title=None):
+        """Render changelog, the newest entry goes first
+
+        :param changelog: Changelog instance
+        :param title: str: document title, the template one by default
+        :return: str
+        """
+        return self.render(reversed(changelog.entries), title=title)
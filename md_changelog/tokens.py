@@ -1,7 +1,8 @@
 # -*- coding: utf-8 -*-
 import abc
 import re
-from collections import namedtuple
+from collections import OrderedDict, namedtuple
+from operator import attrgetter
 
 from datetime import datetime
 
@@ -27,20 +28,59 @@ class Token(Evaluable):
 
 
 class Version(Token):
-    """Version token"""
-
-    VERSION_RE = re.compile(
-        r'(?P<major>\d+)\.(?P<minor>\d+)\.(?P<patch>\d+)(?P<suffix>\+\d+)?')
+    """Version token.
+
+    Supports semver and PEP 440 versions, e.g 1.0.0, 1.0.0-rc.1,
+    1.0.0+build.5, 1.0.0rc1, 1.0.0.post1, 1.0.0.dev2. Numeric '+N' suffix,
+    e.g 0.1.0+1, marks unreleased version.
+    """
+
+    VERSION_RE = re.compile(r'''
+        (?P<major>\d+)\.(?P<minor>\d+)\.(?P<patch>\d+)
+        (?:-(?P<pre>[0-9A-Za-z-]+(?:\.[0-9A-Za-z-]+)*)         # semver
+          |(?P<pep_pre>(?:alpha|beta|preview|pre|rc|a|b|c)\d*)?  # PEP 440
+           (?:\.?post(?P<post>\d+))?
+           (?:\.?dev(?P<dev>\d+))?)
+        (?:\+(?P<suffix>\d+)(?![0-9A-Za-z.-])                   # unreleased
+          |\+(?P<build>[0-9A-Za-z-]+(?:\.[0-9A-Za-z-]+)*))?       # metadata
+    ''', re.VERBOSE)
+    PEP_PRE_RE = re.compile(r'(?P<phase>[a-z]+)(?P<num>\d*)')
+    PEP_PHASES = {'alpha': 'a', 'beta': 'b', 'c': 'rc', 'pre': 'rc',
+                  'preview': 'rc'}
+    BUMP_PARTS = ('major', 'minor', 'patch')
 
     def __init__(self, version_str, matcher=None):
         self.version_str = version_str
-        self._version_dict = {}
         if not matcher:
             matcher = self.VERSION_RE.search(version_str)
+            if not matcher:
+                raise ValueError('Wrong version string %r' % version_str)
         self._version_dict = matcher.groupdict()
-        self._version_tuple = (self._version_dict['major'],
-                               self._version_dict['minor'],
-                               self._version_dict['patch'])
+        self._version_tuple = (int(self._version_dict['major']),
+                               int(self._version_dict['minor']),
+                               int(self._version_dict['patch']))
+        # Precomputed comparison key, build metadata and unreleased suffix
+        # don't affect precedence
+        self.key = self._version_tuple + self._precedence_key()
+
+    def _precedence_key(self):
+        """Pre-release, post-release and dev-release part of comparison key:
+        X.dev1 < X-alpha < X-rc.1 < X < X.post1.dev1 < X.post1
+
+        :return: tuple
+        """
+        values = self._version_dict
+        pre = self.pre_release
+        if pre:
+            phase = (1, tuple((0, int(ident), '') if ident.isdigit()
+                              else (1, 0, ident) for ident in pre))
+        elif values['dev'] is not None and values['post'] is None:
+            phase = (0, ())
+        else:
+            phase = (2, ())
+        post = -1 if values['post'] is None else int(values['post'])
+        dev = float('inf') if values['dev'] is None else int(values['dev'])
+        return phase, post, dev
 
     @classmethod
     def parse(cls, raw_text):
@@ -51,7 +91,74 @@ class Version(Token):
 
     @property
     def released(self):
-        return not self._version_dict.get('suffix')
+        return self._version_dict.get('suffix') is None
+
+    @property
+    def release(self):
+        """Release part of the version, e.g (1, 0, 0) for 1.0.0-rc.1"""
+        return self._version_tuple
+
+    @property
+    def pre_release(self):
+        """Normalized pre-release identifiers, e.g ('rc', '1') for both
+        1.0.0-rc.1 and 1.0.0rc1, ('a', ) for 1.0.0-alpha
+
+        :return: tuple
+        """
+        values = self._version_dict
+        if values['pre']:
+            phase, *idents = values['pre'].split('.')
+            return (self.PEP_PHASES.get(phase, phase), ) + tuple(idents)
+        if values['pep_pre']:
+            matcher = self.PEP_PRE_RE.match(values['pep_pre'])
+            phase = self.PEP_PHASES.get(matcher.group('phase'),
+                                        matcher.group('phase'))
+            return phase, matcher.group('num') or '0'
+        return ()
+
+    @property
+    def build(self):
+        return self._version_dict.get('build')
+
+    @property
+    def public(self):
+        """Version without build metadata and unreleased suffix, e.g 1.0.0
+        for 1.0.0+build.5"""
+        return self.version_str.split('+', 1)[0]
+
+    def unreleased(self):
+        """Get unreleased version following this one, e.g 1.0.0+1 for both
+        1.0.0 and 1.0.0+build.5
+
+        :return: Version instance
+        """
+        return Version('%s+1' % self.public)
+
+    def bump(self, part):
+        """Get the next version. Pre-release is bumped to its final release
+        if possible, e.g 2.0.0-rc.1 -> 2.0.0 for major part
+
+        :param part: str: one of BUMP_PARTS
+        :return: Version instance
+        """
+        if part not in self.BUMP_PARTS:
+            raise ValueError('Wrong version part %r, must be one of %s'
+                             % (part, ', '.join(self.BUMP_PARTS)))
+        major, minor, patch = self._version_tuple
+        values = self._version_dict
+        is_pre = bool(self.pre_release) or (
+            values['dev'] is not None and values['post'] is None)
+        if part == 'major':
+            if not (is_pre and minor == patch == 0):
+                major += 1
+            minor, patch = 0, 0
+        elif part == 'minor':
+            if not (is_pre and patch == 0):
+                minor += 1
+            patch = 0
+        elif not is_pre:
+            patch += 1
+        return Version('%d.%d.%d' % (major, minor, patch))
 
     def eval(self):
         return self.version_str
@@ -61,19 +168,32 @@ class Version(Token):
             self.__class__.__name__, self.version_str, self.released)
 
     def __gt__(self, other):
-        return self._version_tuple > other._version_tuple
+        return self.key > other.key
 
     def __lt__(self, other):
-        return self._version_tuple < other._version_tuple
+        return self.key < other.key
 
     def __ge__(self, other):
-        return self._version_tuple >= other._version_tuple
+        return self.key >= other.key
 
     def __le__(self, other):
-        return self._version_tuple <= other._version_tuple
+        return self.key <= other.key
 
     def __eq__(self, other):
-        return self._version_tuple == other._version_tuple
+        return self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+
+def sort_versions(versions, reverse=False):
+    """Sort versions by precomputed comparison keys
+
+    :param versions: iterable of Version
+    :param reverse: bool
+    :rtype: list
+    """
+    return sorted(versions, key=attrgetter('key'), reverse=reverse)
 
 
 class Date(Token):
@@ -140,26 +260,166 @@ TYPES = message_t(message='',
                   bugfix='Bugfix',
                   improvement='Improvement',
                   breaking='Breaking')
+# Registry of built-in and custom message types, see reset_types()
+TYPE_NAMES = {}  # type value -> name
+MESSAGE_TYPES = OrderedDict()  # type name -> value
+# Precompiled lookup of lowercased bracketed label -> value, e.g
+# '[feature]' -> 'Feature'
+TYPE_LABELS = {}
+TYPE_NAME_RE = re.compile(r'^\w+$')
+# Group headings of the grouped layout: type value -> title, and precompiled
+# lookup of lowercased title -> value, e.g 'features' -> 'Feature'
+GROUP_TITLES = {}
+GROUP_LABELS = {}
+DEFAULT_GROUP_TITLES = {TYPES.message: 'Other',
+                        TYPES.feature: 'Features',
+                        TYPES.bugfix: 'Bugfixes',
+                        TYPES.improvement: 'Improvements',
+                        TYPES.breaking: 'Breaking changes'}
+# Conventional commit prefixes, e.g 'feat: New feature', besides type names
+COMMIT_TYPE_ALIASES = {'feat': TYPES.feature, 'fix': TYPES.bugfix}
+
+
+def reset_types():
+    """Unregister custom message types, only built-in ones are left"""
+    TYPE_NAMES.clear()
+    TYPE_NAMES.update(zip(TYPES, TYPES._fields))
+    MESSAGE_TYPES.clear()
+    MESSAGE_TYPES.update(zip(TYPES._fields, TYPES))
+    TYPE_LABELS.clear()
+    TYPE_LABELS.update(
+        {'[%s]' % name: value for name, value in MESSAGE_TYPES.items()})
+    GROUP_TITLES.clear()
+    GROUP_TITLES.update(DEFAULT_GROUP_TITLES)
+    GROUP_LABELS.clear()
+    GROUP_LABELS.update(
+        {title.lower(): value for value, title in GROUP_TITLES.items()})
+    GROUP_LABELS.update({value.lower(): value for value in TYPES if value})
+
+
+reset_types()
+
+
+def type_name(message_type):
+    """Get message type name by its value, e.g 'feature' for 'Feature'
+
+    :param message_type: str: message type value
+    :return: str
+    """
+    return TYPE_NAMES.get(message_type, str(message_type).lower())
+
+
+def register_type(name, value=None, title=None):
+    """Register custom message type. Types can't override built-in or
+    already registered ones
+
+    :param name: str: type name, e.g 'security'
+    :param value: str: type value rendered in brackets, e.g 'Security'.
+        Capitalized name by default
+    :param title: str: group heading of the grouped layout, e.g
+        'Security fixes'. Type value by default
+    """
+    name = name.lower()
+    value = value or name.capitalize()
+    for val in (name, value):
+        if not TYPE_NAME_RE.match(val):
+            raise WrongMessageTypeError('Wrong message type name: %r' % val)
+    for label in (name, value.lower()):
+        if TYPE_LABELS.get('[%s]' % label, value) != value:
+            raise WrongMessageTypeError(
+                'Message type %s = %s conflicts with the registered type %s'
+                % (name, value, TYPE_LABELS['[%s]' % label] or label))
+    if TYPE_NAMES.get(value, name) != name:
+        raise WrongMessageTypeError(
+            'Message type %s = %s conflicts with the registered type %s'
+            % (name, value, TYPE_NAMES[value]))
+    title = title or GROUP_TITLES.get(value, value)
+    conflict = GROUP_LABELS.get(title.lower(), value)
+    if conflict != value:
+        raise WrongMessageTypeError(
+            'Group title %r of message type %s conflicts with the registered '
+            'type %s' % (title, name, type_name(conflict)))
+    MESSAGE_TYPES[name] = value
+    TYPE_NAMES[value] = name
+    TYPE_LABELS['[%s]' % name] = value
+    TYPE_LABELS['[%s]' % value.lower()] = value
+    GROUP_TITLES[value] = title
+    GROUP_LABELS[title.lower()] = value
+    GROUP_LABELS[value.lower()] = value
+
+
+def register_types(types):
+    """Register custom message types
+
+    :param types: dict: {type name: type value}, e.g config section. Value
+        may be followed by the group title, e.g 'Security, Security fixes'
+    """
+    for name, value in types.items():
+        value, _, title = value.partition(',')
+        register_type(name, value.strip(), title.strip() or None)
+
+
+def group_title(message_type):
+    """Get group heading of the message type, e.g 'Features' for 'Feature'
+
+    :param message_type: str: message type value
+    :return: str
+    """
+    return GROUP_TITLES.get(message_type, message_type)
+
+
+def group_order():
+    """Message types in the order of groups: registered types go first,
+    untyped messages go last
+
+    :return: list of type values
+    """
+    return [value for value in MESSAGE_TYPES.values()
+            if value != TYPES.message] + [TYPES.message]
+
+
+def custom_types():
+    """Get registered custom message types
+
+    :return: dict: {type name: type value}
+    """
+    return {name: value for name, value in MESSAGE_TYPES.items()
+            if name not in TYPES._fields}
 
 
 class Message(Token):
     """Changelog entry message"""
 
     MD_TEMPLATE = '{type} {text}'
+    AUTHOR_TEMPLATE = '{text} (@{author})'
     MESSAGE_RE = re.compile(r'^\* (?P<type>\[\w+\])? ?(?P<message>.*$)')
+    AUTHOR_RE = re.compile(r'^(?P<text>.*?) \(@(?P<author>[^()@]+)\)$')
+    # Commit subject: '[Feature] text', 'feature: text' or 'feat(scope): text'
+    COMMIT_RE = re.compile(r'^(?:\[(?P<label>\w+)\]|'
+                           r'(?P<prefix>\w+)(?:\([^()]*\))?!?:) *'
+                           r'(?P<text>.+)$')
 
-    def __init__(self, text, message_type=None):
+    def __init__(self, text, message_type=None, author=None):
         if not message_type:
             self._type = TYPES.message
         else:
             self._type = message_type
         self._text = text
+        self._author = author or None
 
-    def eval(self):
-        if self._type == TYPES.message:
-            return self._text
+    def eval(self, typed=True):
+        """Render message
+
+        :param typed: bool: render type label, e.g '[Feature]'
+        :return: str
+        """
+        text = self._text
+        if self._author:
+            text = self.AUTHOR_TEMPLATE.format(text=text, author=self._author)
+        if not typed or self._type == TYPES.message:
+            return text
         return self.MD_TEMPLATE.format(type=self.format_type(self._type),
-                                       text=self._text)
+                                       text=text)
 
     @staticmethod
     def format_type(val):
@@ -172,26 +432,93 @@ class Message(Token):
         return val
 
     @classmethod
-    def parse(cls, raw_text):
+    def parse(cls, raw_text, default_type=None):
+        """Parse message line
+
+        :param raw_text: str: message line, e.g '* [Feature] New feature'
+        :param default_type: str: type value of the message without type
+            label, e.g group type of the grouped layout
+        :return: Message instance or None
+        """
         matcher = cls.MESSAGE_RE.search(raw_text)
         if not matcher:
             return None
 
         values_dict = matcher.groupdict()
-        if values_dict['type'] is None:
-            values_dict['type'] = 'message'
+        label = values_dict['type']
+        if label is None:
+            message_type = default_type or TYPES.message
         else:
-            values_dict['type'] = cls.deformat_type(values_dict['type'])
-
-        try:
-            message_type = getattr(TYPES, str(values_dict['type']))
-        except AttributeError:
-            raise WrongMessageTypeError(
-                'Wrong message type: %s' % values_dict['type'])
-        instance = cls(text=str(values_dict['message']),
-                       message_type=message_type)
+            message_type = TYPE_LABELS.get(label.lower())
+            if message_type is None:
+                raise WrongMessageTypeError(
+                    'Wrong message type: %s' % cls.deformat_type(label))
+        text, author = str(values_dict['message']), None
+        matcher = cls.AUTHOR_RE.match(text)
+        if matcher:
+            text, author = matcher.group('text'), matcher.group('author')
+        instance = cls(text=text, message_type=message_type, author=author)
         return instance
 
+    @classmethod
+    def from_commit(cls, commit_message, author=None):
+        """Create message from VCS commit message. Type is taken from the
+        subject prefix: type label, type name or conventional commit type,
+        e.g '[Feature] New feature', 'bugfix: Fixed bug', 'feat: New feature'
+
+        :param commit_message: str: commit message, only the subject line
+            is used
+        :param author: str: commit author
+        :return: Message instance or None if the message is empty
+        """
+        lines = commit_message.strip().splitlines()
+        if not lines:
+            return None
+        subject = lines[0].strip()
+        matcher = cls.COMMIT_RE.match(subject)
+        if matcher:
+            label = (matcher.group('label') or matcher.group('prefix')).lower()
+            message_type = COMMIT_TYPE_ALIASES.get(label) or \
+                TYPE_LABELS.get('[%s]' % label)
+            if message_type is not None:
+                return cls(text=matcher.group('text'),
+                           message_type=message_type, author=author)
+        return cls(text=subject, author=author)
+
+    @property
+    def type(self):
+        return self._type
+
+    @property
+    def text(self):
+        return self._text
+
+    @property
+    def author(self):
+        return self._author
+
+    @property
+    def key(self):
+        return self._type, self._text
+
+    @property
+    def full_key(self):
+        """Key including the author, e.g to detect author changes"""
+        return self._type, self._text, self._author
+
+    @property
+    def normalized_key(self):
+        """Key to detect duplicates: case and whitespaces are ignored"""
+        return self._type, ' '.join(self._text.split()).casefold()
+
     def __repr__(self):
         return '%s(type=%s, text=%s)' % (
             self.__class__.__name__, self._type, self._text)
+
+    def __eq__(self, other):
+        if not isinstance(other, Message):
+            return NotImplemented
+        return self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
@@ -4,8 +4,67 @@
 class VcsBackend(object):
     """VCS utils backend interface"""
 
+    def get_identity(self):
+        """Get user identity. It's resolved once and cached for the process
+
+        :return: dict: {'name': str, 'email': str}, options which are not
+            configured are omitted
+        """
+        raise NotImplementedError()
+
     def get_user_email(self):
         raise NotImplementedError()
 
     def get_user_name(self):
         raise NotImplementedError()
+
+    def get_log(self, revisions=None):
+        """Get authors and subjects of commits at once, the oldest commit
+        goes first. Merge commits are skipped
+
+        :param revisions: str: revision range, e.g 'v0.1.0..HEAD', the whole
+            history of the current revision by default
+        :return: list of (author name, subject)
+        """
+        raise NotImplementedError()
+
+    def show_file(self, rev, path):
+        """Get file content at the given revision
+
+        :param rev: str: revision, e.g commit hash, tag or branch name
+        :param path: str: file path
+        :return: str: file content
+        """
+        raise NotImplementedError()
+
+    def get_tags(self):
+        """Get all tags with their dates at once
+
+        :return: dict: {tag name: 'YYYY-MM-DD'}
+        """
+        raise NotImplementedError()
+
+    def is_modified(self, path):
+        """Check whether the file has uncommitted changes
+
+        :param path: str: file path
+        :return: bool: True if the file is modified or untracked
+        """
+        raise NotImplementedError()
+
+    def commit(self, path, message):
+        """Commit the file only, other changes are left as is
+
+        :param path: str: file path
+        :param message: str: commit message
+        """
+        raise NotImplementedError()
+
+    def create_tag(self, name, message=None, rev=None):
+        """Create annotated tag
+
+        :param name: str: tag name
+        :param message: str: tag message
+        :param rev: str: revision to tag, the current one by default
+        """
+        raise NotImplementedError()
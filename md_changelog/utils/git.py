@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
+import os.path as op
 import subprocess
 
 from md_changelog.utils import VcsBackend
@@ -7,13 +8,81 @@ from md_changelog.utils import VcsBackend
 class GitBackend(VcsBackend):
     """Git utils backend"""
 
+    # User identities are resolved once per process: repository path -> dict
+    _identities = {}
+
+    def __init__(self, path=None):
+        """
+        :param path: str: repository working directory, the current one by
+            default
+        """
+        self.path = path
+
+    def get_identity(self):
+        key = op.abspath(self.path or '.')
+        identity = self._identities.get(key)
+        if identity is None:
+            try:
+                output = self.call_cmd('git', 'config', '--get-regexp',
+                                       r'^user\.(name|email)$', cwd=self.path)
+            except subprocess.CalledProcessError:
+                output = ''  # identity is not configured
+            identity = {}
+            for line in output.splitlines():
+                option, _, value = line.partition(' ')
+                identity[option.split('.', 1)[1]] = value
+            self._identities[key] = identity
+        return identity
+
     def get_user_email(self):
-        return self.call_cmd('git', 'config', 'user.email')
+        return self.get_identity().get('email')
 
     def get_user_name(self):
-        return self.call_cmd('git', 'config', 'user.name')
+        return self.get_identity().get('name')
+
+    def get_log(self, revisions=None):
+        output = self.call_cmd('git', 'log', '--no-merges', '--reverse',
+                               '--format=%an%x1f%s', revisions or 'HEAD',
+                               '--', cwd=self.path)
+        return [tuple(line.split('\x1f', 1))
+                for line in output.splitlines() if '\x1f' in line]
+
+    def show_file(self, rev, path):
+        path = op.abspath(path)
+        return self.call_cmd('git', 'show',
+                             '%s:./%s' % (rev, op.basename(path)),
+                             cwd=op.dirname(path))
+
+    def get_tags(self):
+        output = self.call_cmd(
+            'git', 'for-each-ref', '--format=%(refname:short)%09'
+            '%(creatordate:short)', 'refs/tags', cwd=self.path)
+        tags = {}
+        for line in output.splitlines():
+            name, _, date = line.partition('\t')
+            tags[name] = date
+        return tags
+
+    def is_modified(self, path):
+        path = op.abspath(path)
+        output = self.call_cmd('git', 'status', '--porcelain', '--',
+                               op.basename(path), cwd=op.dirname(path))
+        return bool(output)
+
+    def commit(self, path, message):
+        path = op.abspath(path)
+        name, cwd = op.basename(path), op.dirname(path)
+        self.call_cmd('git', 'add', '--', name, cwd=cwd)
+        return self.call_cmd('git', 'commit', '-q', '-m', message, '--', name,
+                             cwd=cwd)
+
+    def create_tag(self, name, message=None, rev=None):
+        args = ['git', 'tag', '-a', name, '-m', message or name]
+        if rev:
+            args.append(rev)
+        return self.call_cmd(*args, cwd=self.path)
 
     @classmethod
-    def call_cmd(cls, *args):
-        output = subprocess.check_output(args)
+    def call_cmd(cls, *args, cwd=None):
+        output = subprocess.check_output(args, cwd=cwd)
         return output.strip().decode('utf-8')
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import json
+import logging
+import os
+import os.path as op
+import time
+
+from md_changelog.cache import atomic_write
+from md_changelog.entry import Changelog
+from md_changelog.exceptions import ChangelogError
+
+logger = logging.getLogger('md-changelog')
+
+
+class Watcher(object):
+    """Watch the changelog file and incrementally regenerate derived outputs:
+    json export, per-version release notes and the latest entry snippet.
+
+    Raw entry blocks are hashed, so only modified entries are re-parsed and
+    only changed outputs are re-written.
+    """
+
+    JSON_NAME = 'changelog.json'
+    LATEST_NAME = 'LATEST.md'
+
+    def __init__(self, path, out_dir, interval=1.0, debounce=0.5):
+        """
+        :param path: str: changelog path
+        :param out_dir: str: output directory
+        :param interval: float: file stat polling interval in seconds
+        :param debounce: float: wait until the file is not changed for this
+            time before update
+        """
+        self.path = path
+        self.out_dir = out_dir
+        self.interval = interval
+        self.debounce = debounce
+        self._stamp = None
+        self._entries = {}  # block hash -> (LogEntry, dict)
+        self._written = {}  # output path -> content hash
+
+    def stamp(self):
+        """File change stamp: (mtime, size), None if file doesn't exist, e.g
+        editors may remove and create the file again on save
+        """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def update(self):
+        """Re-parse modified entries and re-write changed outputs
+
+        :return: list of written files paths
+        """
+        self._stamp = self.stamp()
+        with open(self.path) as fd:
+            text = fd.read()
+
+        entries, parsed = {}, []
+        for block in Changelog.split_blocks(text)[1:]:
+            key = hashlib.sha1(block.encode('utf-8')).hexdigest()
+            item = self._entries.get(key)
+            if item is None:
+                entry = Changelog.parse_entries(text=block)[0]
+                item = entry, entry.to_dict()
+            entries[key] = item
+            parsed.append(item)
+        self._entries = entries
+
+        outputs = {}
+        for entry, _ in parsed:
+            outputs['%s.md' % entry.version] = entry.eval() + '\n'
+        outputs[self.JSON_NAME] = json.dumps(
+            [data for _, data in parsed], indent=2, ensure_ascii=False)
+        if parsed:
+            outputs[self.LATEST_NAME] = parsed[0][0].eval() + '\n'
+        return self._write(outputs)
+
+    def _write(self, outputs):
+        os.makedirs(self.out_dir, exist_ok=True)
+        written = {}
+        paths = []
+        for name, content in outputs.items():
+            path = op.join(self.out_dir, name)
+            digest = hashlib.sha1(content.encode('utf-8')).hexdigest()
+            if self._written.get(path) != digest:
+                atomic_write(path, content)
+                paths.append(path)
+            written[path] = digest
+
+        # Remove outputs of removed entries
+        for path in set(self._written) - set(written):
+            if op.exists(path):
+                os.remove(path)
+        self._written = written
+        return paths
+
+    def wait_change(self):
+        """Block until the file is changed and stays the same for the
+        debounce time
+        """
+        while True:
+            time.sleep(self.interval)
+            stamp = self.stamp()
+            if stamp == self._stamp:
+                continue
+            while True:
+                time.sleep(self.debounce)
+                new_stamp = self.stamp()
+                if new_stamp == stamp:
+                    break
+                stamp = new_stamp
+            if stamp is not None:
+                return
+
+    def try_update(self):
+        """Update outputs. The file may be broken while it's edited or
+        briefly missing on save: the error is logged and the previous outputs
+        are kept until the next change
+
+        :return: list of written files paths or None on error
+        """
+        try:
+            return self.update()
+        except (ChangelogError, OSError, ValueError) as err:
+            logger.warning('WARNING: %s is not updated: %s', self.out_dir, err)
+            return None
+
+    def run(self, once=False):
+        """Run watch loop
+
+        :param once: bool: update outputs once and exit
+        """
+        if once:
+            paths = self.update()
+        else:
+            paths = self.try_update() or []
+        logger.info('Updated %d file(s) in %s', len(paths), self.out_dir)
+        while not once:
+            self.wait_change()
+            for path in self.try_update() or []:
+                logger.info('Updated %s', path)
@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from md_changelog import tokens
+
+
+@pytest.fixture(autouse=True)
+def message_types():
+    """Custom message types registered by a test are removed after it"""
+    yield
+    tokens.reset_types()
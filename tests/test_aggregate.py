@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+import os.path as op
+import tempfile
+from datetime import datetime
+
+from md_changelog import aggregate, tokens
+from md_changelog.entry import Changelog, LogEntry
+from md_changelog.tokens import Message
+
+
+def make_changelog(path, dates):
+    changelog = Changelog(path=path)
+    for i, date in enumerate(dates):
+        entry = LogEntry(version=tokens.Version('0.%d.0' % i),
+                         date=tokens.Date(date))
+        entry.add_message(Message(text='Release %d' % i))
+        changelog.add_entry(entry)
+    changelog.new_entry()
+    changelog.save()
+
+
+def test_iter_timeline():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        sources = []
+        for project, dates in (
+                ('api', ['2017-01-01', '2017-03-01', '2017-05-01']),
+                ('web', ['2017-02-01', '2017-04-01']),
+                ('db', [])):
+            path = op.join(tmp_dir, '%s.md' % project)
+            make_changelog(path, dates)
+            sources.append((project, path))
+
+        timeline = list(aggregate.iter_timeline(sources))
+        assert [(project, entry.date.eval()) for project, entry in timeline] \
+            == [('api', '2017-05-01'), ('web', '2017-04-01'),
+                ('api', '2017-03-01'), ('web', '2017-02-01'),
+                ('api', '2017-01-01')]
+
+        # Releases of the same date keep the order of sources
+        same_day = op.join(tmp_dir, 'cli.md')
+        make_changelog(same_day, ['2017-04-01'])
+        timeline = aggregate.iter_timeline(sources + [('cli', same_day)])
+        assert [project for project, _ in timeline][:3] == [
+            'api', 'web', 'cli']
+
+        timeline = list(aggregate.iter_timeline(
+            sources, since=datetime(2017, 3, 1)))
+        assert len(timeline) == 3
+
+        project, entry = timeline[0]
+        assert aggregate.render_entry(project, entry) == (
+            'api 0.2.0 (2017-05-01)\n'
+            '----------------------\n'
+            '* Release 2')
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+import tempfile
+
+from md_changelog import tokens
+from md_changelog.columnar import ColumnarStore
+from md_changelog.entry import Changelog, LogEntry
+from md_changelog.tokens import Message
+from tests.test_entry import get_fixtures_path
+
+
+def test_columnar_store_parse():
+    path = get_fixtures_path('Changelog.md')
+    changelog = Changelog.parse(path=path)
+    store = ColumnarStore.parse(path=path)
+
+    assert len(store) == 2
+    assert store.message_count == 15
+    assert str(store.versions[0]) == '0.1.0+1'
+    assert store.entry(0) == changelog.last_entry
+    assert store.entry(-1) == changelog.entries[0]
+    assert store.to_changelog() == changelog
+
+    assert store.type_counts(entry_index=1) == {tokens.TYPES.message: 1,
+                                                tokens.TYPES.feature: 1}
+    assert store.type_counts()[tokens.TYPES.feature] == 11
+
+
+def test_columnar_store_from_changelog():
+    changelog = Changelog(path=None)
+    entry = LogEntry(version=tokens.Version('0.1.0'), date=tokens.Date())
+    entry.add_message(Message(text='Юникод message'))
+    entry.add_message(Message(text='Fixed',
+                              message_type=tokens.TYPES.bugfix,
+                              author='Jane Roe'))
+    changelog.add_entry(entry)
+    changelog.new_entry()
+
+    store = ColumnarStore.from_changelog(changelog)
+    assert len(store) == 2
+    assert list(store)[1] == entry
+    assert store.text(0) == 'Юникод message'
+    assert store.message(1).type == tokens.TYPES.bugfix
+    assert store.message(1).author == 'Jane Roe'
+    assert store.message(0).author is None
+    assert store.type_counts(entry_index=0) == {}
+
+    with tempfile.NamedTemporaryFile() as tmp_file:
+        changelog.path = tmp_file.name
+        changelog.save()
+        assert ColumnarStore.parse(tmp_file.name).to_changelog() == changelog
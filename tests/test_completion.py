@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+import os
+import os.path as op
+import shutil
+import subprocess
+import tempfile
+
+import pytest
+
+from md_changelog import completion, main, tokens
+from md_changelog.entry import Changelog, LogEntry
+
+
+def read_cache(changelog):
+    with open(completion.get_cache_path(changelog.path)) as fd:
+        return dict(line.rstrip('\n').split(' ', 1) for line in fd)
+
+
+def test_completion_cache():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = op.join(tmp_dir, 'Changelog.md')
+        changelog = Changelog(path=path)
+        changelog.new_entry()
+        changelog.save()
+        # Cache is disabled until it is written explicitly
+        assert not op.exists(completion.get_cache_path(path))
+
+        completion.write_cache(changelog)
+        assert read_cache(changelog) == {
+            'versions': '0.1.0+1',
+            'types': ' '.join(tokens.MESSAGE_TYPES),
+        }
+
+        # Cache is refreshed on save
+        changelog.entries.insert(0, LogEntry(
+            version=tokens.Version('0.0.1'), date=tokens.Date('2017-01-01')))
+        changelog.save()
+        assert read_cache(changelog)['versions'] == '0.1.0+1 0.0.1'
+
+        # ... and on transaction commit
+        with Changelog.transaction(path) as changelog:
+            changelog.entries.insert(1, LogEntry(
+                version=tokens.Version('0.0.2'),
+                date=tokens.Date('2017-01-02')))
+        assert read_cache(changelog)['versions'] == '0.1.0+1 0.0.2 0.0.1'
+
+
+def test_bash_script():
+    script = completion.bash_script(main.create_parser(),
+                                    main.VERSION_OPTIONS)
+    assert 'release:-v|release:--version|' in script
+    assert '|show:--since|show:--until|' in script
+    assert 'release) words="-h --help -v --version --bump' in script
+    assert 'words="init release ' in script
+    assert '.md-changelog-cache/completion' in script
+    assert 'complete -o default -F _md_changelog md-changelog' in script
+
+
+def test_bash_script_custom_types():
+    tokens.register_types({'security': 'Security', 'release': 'Release'})
+    script = completion.bash_script(main.create_parser(),
+                                    main.VERSION_OPTIONS)
+    # Type conflicting with the command doesn't change its options
+    assert 'release) words="-h --help -v --version --bump' in script
+    assert 'security) words=' not in script
+    assert '*) words="-h --help --author --split-by' in script
+
+
+@pytest.mark.skipif(shutil.which('bash') is None, reason='bash is required')
+def test_bash_script_versions():
+    script = completion.bash_script(main.create_parser(),
+                                    main.VERSION_OPTIONS,
+                                    config_name=main.CONFIG_NAME)
+
+    def complete(cwd, *words):
+        command = ('%s\nCOMP_WORDS=(md-changelog %s "")\n'
+                   'COMP_CWORD=%d\n_md_changelog\necho "${COMPREPLY[*]}"'
+                   % (script, ' '.join(words), len(words) + 1))
+        return subprocess.check_output(['bash', '-c', command], cwd=cwd,
+                                       universal_newlines=True).split()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Changelog path is relative to the config directory
+        os.makedirs(op.join(tmp_dir, 'docs', 'sub'))
+        with open(op.join(tmp_dir, main.CONFIG_NAME), 'w') as fd:
+            fd.write('[md-changelog]\nchangelog = docs/Changelog.md\n')
+        changelog = Changelog(path=op.join(tmp_dir, 'docs', 'Changelog.md'))
+        changelog.new_entry()
+        completion.write_cache(changelog)
+
+        # Config is found in parent directories
+        for cwd in (tmp_dir, op.join(tmp_dir, 'docs', 'sub')):
+            assert complete(cwd, 'release', '-v') == ['0.1.0+1']
+        assert complete(op.join(tmp_dir, 'docs'), '-c',
+                        '../' + main.CONFIG_NAME, 'show', '--since') == \
+            ['0.1.0+1']
@@ -1,11 +1,14 @@
 # -*- coding: utf-8 -*-
+import os
 import os.path as op
 import tempfile
 
+import mock
 import pytest
 
 from md_changelog import tokens
-from md_changelog.entry import Changelog, LogEntry
+from md_changelog.entry import (MODE_GROUP, MODE_LIST, Changelog, LogEntry,
+                                _parse_chunk)
 from md_changelog.tokens import Message
 
 FIXTURES_DIR = op.abspath(op.dirname(__file__)) + '/fixtures'
@@ -84,3 +87,262 @@ def test_changelog_backup():
         assert changelog.undo() is True
         assert len(changelog.entries) == 1
         assert changelog.entries[0] == new_entry
+
+
+def test_changelog_diff(raw_changelog):
+    old = Changelog.from_text(text=raw_changelog)
+    new = Changelog.from_text(text=raw_changelog)
+    assert not any(old.diff(new))
+
+    # Change unreleased entry and add a new release
+    new.last_entry.add_message(Message(text='New message'))
+    released = new.entries[0]
+    entry = LogEntry(version=tokens.Version('0.2.0'), date=tokens.Date())
+    entry.add_message(Message(text='Release'))
+    new.add_entry(entry)
+
+    diff = old.diff(new)
+    assert diff.added == [entry]
+    assert diff.removed == []
+    assert len(diff.changed) == 1
+    change = diff.changed[0]
+    assert str(change.new.version) == '0.1.0+1'
+    assert change.added == [Message(text='New message')]
+    assert change.removed == []
+    assert released not in [c.new for c in diff.changed]
+
+    # Reverse direction
+    diff = new.diff(old)
+    assert diff.removed == [entry]
+    assert diff.changed[0].removed == [Message(text='New message')]
+
+    # Author change is reported as removed and added message
+    old = Changelog.from_text(text=new.eval())
+    message = new.entries[0].messages[0]
+    new.entries[0].messages[0] = Message(text=message.text,
+                                         message_type=message.type,
+                                         author='bob')
+    change, = old.diff(new).changed
+    assert [m.author for m in change.added] == ['bob']
+    assert [m.author for m in change.removed] == [None]
+
+
+def test_changelog_next_version():
+    changelog = Changelog(path=None)
+    entry = LogEntry(version=tokens.Version('0.1.0'), date=tokens.Date())
+    changelog.add_entry(entry)
+    new_entry = changelog.new_entry()
+    assert str(changelog.next_version()) == '0.1.1'
+
+    new_entry.add_message(Message(text='Feature',
+                                  message_type=tokens.TYPES.feature))
+    assert str(changelog.next_version()) == '0.2.0'
+
+    new_entry.add_message(Message(text='Breaking',
+                                  message_type=tokens.TYPES.breaking))
+    assert str(changelog.next_version()) == '1.0.0'
+    assert str(changelog.next_version(part='patch')) == '0.1.1'
+
+
+def test_changelog_new_entry_after_build_metadata():
+    changelog = Changelog(path=None)
+    entry = LogEntry(version=tokens.Version('1.0.0+build.5'),
+                     date=tokens.Date())
+    changelog.add_entry(entry)
+    new_entry = changelog.new_entry()
+    new_entry.add_message(Message(text='Test message'))
+    assert str(new_entry.version) == '1.0.0+1'
+    assert new_entry.version.released is False
+
+    entries = Changelog.parse_entries(text=changelog.eval())
+    assert [str(e.version) for e in entries] == ['1.0.0+1', '1.0.0+build.5']
+    assert entries[0].version.released is False
+
+
+def test_log_entry_dedupe():
+    entry = LogEntry(version=tokens.Version('0.1.0+1'), date=tokens.Date(''))
+    assert entry.add_message(Message(text='Fixed  bug')) is True
+    assert entry.has_message(Message(text='fixed bug'))
+    assert not entry.has_message(
+        Message(text='fixed bug', message_type=tokens.TYPES.bugfix))
+
+    assert entry.add_message(Message(text='FIXED bug'), dedupe=True) is False
+    assert entry.add_message(Message(text='FIXED bug')) is True
+    assert len(entry.messages) == 2
+
+
+def test_changelog_message_index(raw_changelog):
+    changelog = Changelog.from_text(text=raw_changelog)
+    index = changelog.message_index()
+    assert Message(text='initial  release').normalized_key in index
+    assert Message(text='Unknown').normalized_key not in index
+
+
+def test_changelog_stats():
+    changelog = Changelog(path=None)
+    for version, date, m_types in (
+            ('0.1.0', '2016-07-06', [tokens.TYPES.feature]),
+            ('0.1.1', '2016-07-08', [tokens.TYPES.bugfix] * 2),
+            ('0.2.0', '2016-07-18', [tokens.TYPES.feature,
+                                     tokens.TYPES.message])):
+        entry = LogEntry(version=tokens.Version(version),
+                         date=tokens.Date(date))
+        for m_type in m_types:
+            entry.add_message(Message(text='Test', message_type=m_type))
+        changelog.add_entry(entry)
+    changelog.new_entry().add_message(Message(text='Unreleased'))
+
+    stats = changelog.stats()
+    assert [item['version'] for item in stats['releases']] == [
+        '0.1.0', '0.1.1', '0.2.0']
+    assert stats['releases'][1]['types'] == {'bugfix': 2}
+    assert stats['types'] == {'feature': 2, 'bugfix': 2, 'message': 1}
+    assert stats['messages'] == 5
+    assert stats['unreleased']['messages'] == 1
+    assert stats['cadence']['mean_days'] == 6
+    assert stats['cadence']['min_days'] == 2
+
+    stats = changelog.stats(since='0.1.1', until='0.1.1')
+    assert [item['version'] for item in stats['releases']] == ['0.1.1']
+    assert stats['messages_per_release'] == 2
+    assert stats['cadence']['mean_days'] is None
+
+
+def test_changelog_parse_parallel(raw_changelog):
+    changelog = Changelog(path=None)
+    for i in range(50):
+        entry = LogEntry(version=tokens.Version('0.%d.0' % i),
+                         date=tokens.Date())
+        for j in range(i % 7):
+            entry.add_message(Message(text='Message %d' % j,
+                                      message_type=tokens.TYPES.feature))
+        changelog.add_entry(entry)
+    text = changelog.eval() + raw_changelog
+
+    chunks = Changelog.split_chunks(text, count=8)
+    assert len(chunks) == 8
+    assert ''.join(chunks) == text
+    for chunk in chunks[1:]:
+        assert Changelog.is_header_line(chunk.splitlines()[0])
+
+    expected = Changelog.parse_entries(text=text)
+    entries = Changelog.parse_entries_parallel(text=text, workers=2,
+                                               min_size=0)
+    assert len(entries) == 52
+    assert entries == expected
+
+    # Small texts are parsed sequentially
+    assert Changelog.parse_entries_parallel(text=raw_changelog) == \
+        Changelog.parse_entries(text=raw_changelog)
+
+    # Custom message types are registered in workers
+    entries = _parse_chunk('0.1.0 (2016-03-11)\n---\n* [Security] Fix\n',
+                           {'security': 'Security'})
+    assert entries[0].messages[0].type == 'Security'
+
+
+def test_changelog_transaction(raw_changelog):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = op.join(tmp_dir, 'Changelog.md')
+        with open(path, 'w') as fd:
+            fd.write(raw_changelog)
+        os.chmod(path, 0o640)
+
+        with mock.patch('copy.deepcopy') as copy_mock, \
+                mock.patch.object(Changelog, 'save') as save_mock:
+            with Changelog.transaction(path) as changelog:
+                changelog.last_entry.set_version(tokens.Version('0.2.0'))
+                changelog.last_entry.set_date(tokens.Date())
+                for i in range(3):
+                    changelog.new_entry().add_message(Message(text=str(i)))
+                    changelog.last_entry.set_version(
+                        tokens.Version('0.%d.0' % (i + 3)))
+                    changelog.last_entry.set_date(tokens.Date())
+                # Nothing is written until exit
+                with open(path) as fd:
+                    assert fd.read() == raw_changelog
+        # No backups and no saves within transaction
+        assert not copy_mock.called
+        assert not save_mock.called
+
+        changelog = Changelog.parse(path)
+        assert [str(v) for v in changelog.versions] == [
+            '0.1.0', '0.2.0', '0.3.0', '0.4.0', '0.5.0']
+        assert os.stat(path).st_mode & 0o777 == 0o640
+
+        # Roll back on error
+        with open(path) as fd:
+            content = fd.read()
+        with pytest.raises(RuntimeError):
+            with Changelog.transaction(path) as changelog:
+                changelog.new_entry()
+                raise RuntimeError('Broken release script')
+        assert len(changelog.entries) == 5
+        with open(path) as fd:
+            assert fd.read() == content
+
+
+def test_changelog_grouped_mode(raw_changelog):
+    changelog = Changelog.from_text(raw_changelog)
+    entry = changelog.entries[0]
+    grouped = entry.eval(mode=MODE_GROUP)
+    lines = grouped.splitlines()
+    assert lines[2] == '### Features'
+    # Groups keep message order and untyped messages go last
+    titles = [line for line in lines if line.startswith('###')]
+    assert titles == ['### %s' % tokens.group_title(m_type)
+                      for m_type in tokens.group_order()
+                      if any(m.type == m_type for m in entry.messages)]
+    assert '[Feature]' not in grouped
+
+    # Both layouts are parsed into the same entries, messages are reordered
+    # by groups only
+    text = changelog.eval(mode=MODE_GROUP)
+    parsed = Changelog.from_text(text, mode=MODE_GROUP)
+    assert parsed.versions == changelog.versions
+    for new, old in zip(parsed.entries, changelog.entries):
+        assert sorted(new.messages, key=lambda m: m.key) == \
+            sorted(old.messages, key=lambda m: m.key)
+    assert parsed.eval() == text
+    assert Changelog.from_text(parsed.eval(mode=MODE_LIST)).eval(
+        mode=MODE_GROUP) == text
+
+    # Explicit type label wins over the group type
+    entries = Changelog.parse_entries(
+        'Changelog\n=========\n\n0.2.0 (2017-06-04)\n------------------\n'
+        '### Features\n* One\n* [Bugfix] Two\n### Unknown\n* Three\n')
+    assert [(m.type, m.text) for m in entries[0].messages] == [
+        (tokens.TYPES.feature, 'One'), (tokens.TYPES.bugfix, 'Two'),
+        (tokens.TYPES.message, 'Three')]
+
+
+def test_changelog_grouped_mode_custom_types():
+    tokens.register_types({'security': 'Security, Security fixes',
+                           'deprecation': 'Deprecated'})
+    entry = LogEntry(version=tokens.Version('0.2.0'),
+                     date=tokens.Date('2017-06-04'))
+    entry.add_message(Message(text='Fixed XSS', message_type='Security'))
+    entry.add_message(Message(text='Old API', message_type='Deprecated'))
+    grouped = entry.eval(mode=MODE_GROUP)
+    assert '### Security fixes\n* Fixed XSS' in grouped
+    assert '### Deprecated\n* Old API' in grouped
+
+    parsed = Changelog.parse_entries(grouped)[0]
+    assert [(m.type, m.text) for m in parsed.messages] == [
+        ('Security', 'Fixed XSS'), ('Deprecated', 'Old API')]
+
+    # Spawned worker without parent process state gets the same result
+    text = '\n\n'.join([grouped] * 3)
+    expected = Changelog.parse_entries(text)
+    executor_mock = mock.MagicMock()
+    executor_mock.__enter__.return_value.map.side_effect = \
+        lambda func, chunks, types: [
+            (tokens.reset_types(), func(chunk, chunk_types))[1]
+            for chunk, chunk_types in zip(chunks, types)]
+    with mock.patch('md_changelog.entry.ProcessPoolExecutor',
+                    return_value=executor_mock):
+        entries = Changelog.parse_entries_parallel(text, workers=2,
+                                                   min_size=0)
+    assert entries == expected
+    assert [m.type for m in entries[-1].messages] == ['Security',
+                                                      'Deprecated']
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+import os.path as op
+import tempfile
+
+import pytest
+
+from md_changelog import tokens
+from md_changelog.entry import Changelog
+from md_changelog.exceptions import ChangelogError
+from md_changelog.journal import Journal, block_delta
+from md_changelog.tokens import Message
+from tests.test_entry import get_fixtures
+
+
+def test_block_delta():
+    old = Changelog.from_text(get_fixtures('Changelog.md')).eval()
+    changelog = Changelog.from_text(old)
+    changelog.last_entry.add_message(Message(text='New'))
+    new = changelog.eval()
+
+    delta = block_delta(old, new)
+    # Only the changed entry is recorded
+    assert delta['old'].startswith('0.1.0+1 (UNRELEASED)')
+    assert '0.1.0 (2016-03-11)' not in delta['old']
+    assert delta['new'].startswith('0.1.0+1 (UNRELEASED)')
+    assert '* New\n' in delta['new']
+    start = delta['offset']
+    assert new[:start] + delta['old'] + \
+        new[start + len(delta['new']):] == old
+
+
+def test_journal_undo():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = op.join(tmp_dir, 'Changelog.md')
+        changelog = Changelog(path=path)
+        changelog.new_entry()
+        changelog.save()
+        with open(path) as fd:
+            initial = fd.read()
+
+        journal = Journal(path, size=3)
+        snapshots = [initial]
+        for i in range(4):
+            with Changelog.transaction(
+                    path, on_save=lambda old, new: journal.record(
+                        'feature', old, new)) as changelog:
+                changelog.last_entry.add_message(Message(
+                    text='Feature %d' % i,
+                    message_type=tokens.TYPES.feature))
+            with open(path) as fd:
+                snapshots.append(fd.read())
+
+        # Journal is size-bounded
+        records = journal.records()
+        assert len(records) == 3
+        assert [r['operation'] for r in records] == ['feature'] * 3
+        assert Journal.describe(records[-1]) == '0.1.0+1 (UNRELEASED)'
+
+        assert len(journal.undo()) == 1
+        with open(path) as fd:
+            assert fd.read() == snapshots[3]
+        assert len(journal.undo(count=10)) == 2
+        with open(path) as fd:
+            assert fd.read() == snapshots[1]
+        assert journal.undo() == []
+        assert journal.records() == []
+
+        # Changes made outside of the journal are not overwritten
+        with Changelog.transaction(path, on_save=lambda old, new:
+                                   journal.record('bugfix', old, new)) \
+                as changelog:
+            changelog.last_entry.add_message(Message(text='Fix'))
+        changelog = Changelog.parse(path)
+        changelog.last_entry.messages[-1]._text = 'Edited fix'
+        changelog.save()
+        with pytest.raises(ChangelogError):
+            journal.undo()
+        assert len(journal.records()) == 1
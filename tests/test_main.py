@@ -1,14 +1,19 @@
 # -*- coding: utf-8 -*-
+import json
+import os
 import os.path as op
+import shutil
+import subprocess
 import tempfile
 from contextlib import contextmanager
 
 import mock
 import pytest
 
-from md_changelog import main
+from md_changelog import main, tokens
 from md_changelog.entry import Changelog
-from md_changelog.exceptions import ConfigNotFoundError
+from md_changelog.exceptions import ChangelogError, ConfigNotFoundError
+from md_changelog.utils.git import GitBackend
 
 
 @pytest.fixture
@@ -109,3 +114,537 @@ def test_show_last(parser):
     with get_test_config() as cfg_path:
         args = parser.parse_args(['-c', cfg_path, 'last'])
         args.func(args)
+
+
+def test_group_mode(parser, capsys):
+    with get_test_config() as cfg_path:
+        config = main.get_config(cfg_path)
+        assert config['md-changelog']['mode'] == 'list'
+        config['md-changelog']['mode'] = 'group'
+        with open(cfg_path, 'w') as fd:
+            config.write(fd)
+
+        for m_type, text in [('feature', 'One'), ('bugfix', 'Two'),
+                             ('feature', 'Three')]:
+            args = parser.parse_args(['-c', cfg_path, m_type, text])
+            args.func(args)
+        with open(config['md-changelog']['changelog']) as fd:
+            content = fd.read()
+        assert '### Features\n* One\n* Three\n\n### Bugfixes\n* Two' \
+            in content
+
+        args = parser.parse_args(['-c', cfg_path, 'last', '--mode', 'list'])
+        args.func(args)
+        out = capsys.readouterr().out
+        assert '* [Feature] One\n* [Feature] Three\n* [Bugfix] Two' in out
+
+        with mock.patch('subprocess.call'):
+            args = parser.parse_args(['-c', cfg_path, 'release',
+                                      '-v', '0.2.0', '-y'])
+            args.func(args)
+        args = parser.parse_args(['-c', cfg_path, 'append', '--no-edit'])
+        args.func(args)
+        args = parser.parse_args(['-c', cfg_path, 'show', '--since', '0.2.0'])
+        args.func(args)
+        out = capsys.readouterr().out
+        assert '0.2.0+1 (UNRELEASED)' in out
+        assert '### Features\n* One' in out
+        assert '0.1.0' not in out
+
+
+def test_diff(parser, capsys):
+    with get_test_config() as cfg_path:
+        config = main.get_config(cfg_path)
+        changelog_path = config['md-changelog']['changelog']
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.md') as old:
+            with open(changelog_path) as fd:
+                old.write(fd.read())
+            old.flush()
+
+            args = parser.parse_args(['-c', cfg_path, 'bugfix', 'Fixed'])
+            args.func(args)
+
+            args = parser.parse_args(['-c', cfg_path, 'diff', old.name])
+            args.func(args)
+            out = capsys.readouterr().out
+            assert '~ 0.1.0+1 (UNRELEASED)' in out
+            assert '+ * [Bugfix] Fixed' in out
+
+
+def test_release_edit_entry(parser):
+    def editor(cmd):
+        # Emulate user editing: set the release version manually
+        with open(cmd[1]) as fd:
+            content = fd.read()
+        with open(cmd[1], 'w') as fd:
+            fd.write(content.replace('0.1.0+1', '0.2.0'))
+
+    with get_test_config() as cfg_path:
+        config = main.get_config(cfg_path)
+        changelog_path = config['md-changelog']['changelog']
+        with open(changelog_path) as fd:
+            original = fd.read()
+
+        args = parser.parse_args(['-c', cfg_path, 'release'])
+        with mock.patch('subprocess.call', side_effect=editor) as call_mock, \
+                mock.patch('md_changelog.main.get_input', return_value='n'):
+            with pytest.raises(SystemExit):
+                args.func(args)
+            # Only the released entry is opened in the editor
+            assert call_mock.call_args[0][0][1] != changelog_path
+        with open(changelog_path) as fd:
+            assert fd.read() == original
+
+        with mock.patch('subprocess.call', side_effect=editor), \
+                mock.patch('md_changelog.main.get_input', return_value='Y'):
+            args.func(args)
+        changelog = Changelog.parse(path=changelog_path)
+        assert len(changelog.entries) == 1
+        assert str(changelog.last_entry.version) == '0.2.0'
+        assert changelog.last_entry.version.released
+
+
+def test_release_bump(parser):
+    with get_test_config() as cfg_path:
+        changelog_path = main.get_config(cfg_path)['md-changelog']['changelog']
+        args = parser.parse_args(['-c', cfg_path, 'feature', 'New feature'])
+        args.func(args)
+
+        args = parser.parse_args(
+            ['-c', cfg_path, 'release', '--bump', 'auto', '-y'])
+        args.func(args)
+        changelog = Changelog.parse(path=changelog_path)
+        assert str(changelog.last_entry.version) == '0.2.0'
+
+        args = parser.parse_args(['-c', cfg_path, 'append', '--no-edit'])
+        args.func(args)
+        args = parser.parse_args(
+            ['-c', cfg_path, 'release', '--bump', 'major', '-y'])
+        args.func(args)
+        changelog = Changelog.parse(path=changelog_path)
+        assert [str(v) for v in changelog.versions] == ['0.2.0', '1.0.0']
+
+    with pytest.raises(SystemExit):
+        parser.parse_args(['release', '--bump', 'patch', '-v', '1.0.0'])
+
+
+def test_add_message_dedupe(parser):
+    with get_test_config() as cfg_path:
+        changelog_path = main.get_config(cfg_path)['md-changelog']['changelog']
+        for _ in range(2):
+            args = parser.parse_args(
+                ['-c', cfg_path, 'bugfix', 'Fixed bug; Fixed bug',
+                 '--split-by', ';', '--dedupe'])
+            args.func(args)
+        changelog = Changelog.parse(path=changelog_path)
+        assert len(changelog.last_entry.messages) == 1
+
+        args = parser.parse_args(['-c', cfg_path, 'bugfix', 'Fixed bug'])
+        args.func(args)
+        changelog = Changelog.parse(path=changelog_path)
+        assert len(changelog.last_entry.messages) == 2
+
+        # Check the whole history after release
+        args = parser.parse_args(['-c', cfg_path, 'release', '-y',
+                                  '--bump', 'patch'])
+        args.func(args)
+        args = parser.parse_args(
+            ['-c', cfg_path, 'bugfix', 'fixed BUG', '--dedupe'])
+        args.func(args)
+        args = parser.parse_args(
+            ['-c', cfg_path, 'bugfix', 'Fixed bug; Other bug', '--split-by',
+             ';', '--dedupe-all'])
+        args.func(args)
+        changelog = Changelog.parse(path=changelog_path)
+        assert [m.text for m in changelog.last_entry.messages] == [
+            'fixed BUG', 'Other bug']
+
+
+def test_stats(parser, capsys):
+    with get_test_config() as cfg_path:
+        args = parser.parse_args(['-c', cfg_path, 'feature', 'New feature'])
+        args.func(args)
+        args = parser.parse_args(['-c', cfg_path, 'release', '-y',
+                                  '--bump', 'auto'])
+        args.func(args)
+
+        args = parser.parse_args(['-c', cfg_path, 'stats', '--json'])
+        args.func(args)
+        result = json.loads(capsys.readouterr().out)
+        assert result['releases'][0]['version'] == '0.2.0'
+        assert result['types'] == {'feature': 1}
+
+        args = parser.parse_args(['-c', cfg_path, 'stats'])
+        args.func(args)
+        assert 'Releases: 1, messages: 1' in capsys.readouterr().out
+
+
+def test_tags(parser):
+    with get_test_config() as cfg_path:
+        for version in ('0.1.1', '0.2.0'):
+            args = parser.parse_args(['-c', cfg_path, 'release', '-y',
+                                      '-v', version])
+            args.func(args)
+            args = parser.parse_args(['-c', cfg_path, 'append', '--no-edit'])
+            args.func(args)
+
+        args = parser.parse_args(['-c', cfg_path, 'tags', '--create'])
+        with mock.patch.object(GitBackend, 'get_tags',
+                               return_value={'v0.1.1': '2016-07-06'}), \
+                mock.patch.object(GitBackend, 'is_modified',
+                                  return_value=False), \
+                mock.patch.object(GitBackend, 'create_tag') as create_mock:
+            args.func(args)
+        create_mock.assert_called_once_with('v0.2.0',
+                                            message='Release 0.2.0')
+
+        with mock.patch.object(GitBackend, 'get_tags', return_value={}), \
+                mock.patch.object(GitBackend, 'is_modified',
+                                  return_value=False), \
+                mock.patch.object(GitBackend, 'create_tag') as create_mock:
+            with pytest.raises(SystemExit):
+                args.func(args)
+        # Only the latest release is tagged automatically
+        assert create_mock.call_count == 1
+
+        # Uncommitted changelog isn't tagged
+        with mock.patch.object(GitBackend, 'get_tags', return_value={}), \
+                mock.patch.object(GitBackend, 'is_modified',
+                                  return_value=True), \
+                mock.patch.object(GitBackend, 'create_tag') as create_mock:
+            with pytest.raises(SystemExit):
+                args.func(args)
+        assert not create_mock.called
+
+        # Version with dev suffix isn't tagged
+        args = parser.parse_args(['-c', cfg_path, 'release', '-y', '--tag'])
+        with mock.patch.object(GitBackend, 'is_modified',
+                               return_value=False), \
+                mock.patch.object(GitBackend, 'commit') as commit_mock, \
+                mock.patch.object(GitBackend, 'create_tag') as create_mock:
+            args.func(args)
+        assert not commit_mock.called
+        assert not create_mock.called
+
+
+def git(cwd, *args):
+    return subprocess.check_output(('git', ) + args, cwd=cwd,
+                                   universal_newlines=True)
+
+
+@pytest.mark.skipif(shutil.which('git') is None, reason='git is required')
+def test_release_tag(parser):
+    with get_test_config() as cfg_path:
+        root = op.dirname(cfg_path)
+        git(root, 'init', '-q')
+        git(root, 'config', 'user.name', 'Jane Roe')
+        git(root, 'config', 'user.email', 'jane@example.com')
+        args = parser.parse_args(['-c', cfg_path, 'feature', 'New feature'])
+        args.func(args)
+
+        # Uncommitted changes of the changelog aren't released with --tag
+        args = parser.parse_args(['-c', cfg_path, 'release', '-y',
+                                  '--bump', 'patch', '--tag'])
+        with pytest.raises(SystemExit):
+            args.func(args)
+        changelog_path = op.join(root, 'Changelog.md')
+        assert Changelog.parse(path=changelog_path).last_entry.released \
+            is False
+
+        git(root, 'add', 'Changelog.md', main.CONFIG_NAME)
+        git(root, 'commit', '-q', '-m', 'Init')
+        args.func(args)
+
+        # The release is committed and the tag points to it
+        assert git(root, 'tag').split() == ['v0.1.1']
+        assert git(root, 'log', '-1', '--format=%s', 'v0.1.1').strip() == \
+            'Release 0.1.1'
+        assert '0.1.1 (' in git(root, 'show', 'v0.1.1:Changelog.md')
+        assert git(root, 'status', '--porcelain', '--',
+                   'Changelog.md') == ''
+
+
+@pytest.mark.skipif(shutil.which('git') is None, reason='git is required')
+def test_cache_dir_ignored(parser):
+    with get_test_config() as cfg_path:
+        root = op.dirname(cfg_path)
+        git(root, 'init', '-q')
+        args = parser.parse_args(['-c', cfg_path, 'message', 'hi'])
+        args.func(args)
+        assert op.isdir(op.join(root, '.md-changelog-cache'))
+        # Lock, journal and caches don't show up in the project status
+        assert sorted(git(root, 'status', '--porcelain').splitlines()) == [
+            '?? %s' % main.CONFIG_NAME, '?? Changelog.md']
+
+
+def test_message_authors(parser):
+    with get_test_config() as cfg_path:
+        args = parser.parse_args(['-c', cfg_path, 'feature', 'One',
+                                  '--author', 'bob'])
+        args.func(args)
+
+        with open(cfg_path, 'a') as fd:
+            fd.write('authors = yes\n')
+        main.ProjectContext.clear()
+        with mock.patch.object(GitBackend, 'get_identity',
+                               return_value={'name': 'Jane Roe'}):
+            args = parser.parse_args(['-c', cfg_path, 'bugfix', 'Two'])
+            args.func(args)
+            args = parser.parse_args(['-c', cfg_path, 'auto-message',
+                                      'fix(cli): Three\n\nDetails'])
+            args.func(args)
+            args = parser.parse_args(['-c', cfg_path, 'auto-message',
+                                      'Untyped', '--typed-only'])
+            args.func(args)
+
+        changelog = main.get_changelog(cfg_path)
+        assert [m.eval() for m in changelog.last_entry.messages] == [
+            '[Feature] One (@bob)', '[Bugfix] Two (@Jane Roe)',
+            '[Bugfix] Three (@Jane Roe)']
+        main.ProjectContext.clear()
+
+
+def test_import_commits(parser):
+    with get_test_config() as cfg_path:
+        args = parser.parse_args(['-c', cfg_path, 'release', '-y',
+                                  '-v', '0.2.0'])
+        args.func(args)
+
+        log = [('Jane Roe', 'feat: New command'), ('Bob', 'Fixed crash'),
+               ('Bob', '[Bugfix] Fixed parser')]
+        args = parser.parse_args(['-c', cfg_path, 'import'])
+        with mock.patch.object(GitBackend, 'get_tags',
+                               return_value={'v0.2.0': '2017-06-04'}), \
+                mock.patch.object(GitBackend, 'get_log',
+                                  return_value=log) as log_mock:
+            args.func(args)
+            # Import is idempotent
+            args.func(args)
+        log_mock.assert_called_with('v0.2.0..HEAD')
+
+        changelog = main.get_changelog(cfg_path)
+        assert str(changelog.last_entry.version) == '0.2.0+1'
+        assert [m.eval() for m in changelog.last_entry.messages] == [
+            '[Feature] New command', 'Fixed crash', '[Bugfix] Fixed parser']
+
+
+def test_undo_history(parser, capsys):
+    with get_test_config() as cfg_path:
+        changelog_path = main.get_config(cfg_path)['md-changelog']['changelog']
+        with open(changelog_path) as fd:
+            initial = fd.read()
+
+        for argv in (['feature', 'One'], ['bugfix', 'Two'],
+                     ['release', '-y', '-v', '0.2.0']):
+            args = parser.parse_args(['-c', cfg_path] + argv)
+            args.func(args)
+
+        args = parser.parse_args(['-c', cfg_path, 'history'])
+        args.func(args)
+        lines = capsys.readouterr().out.splitlines()
+        assert len(lines) == 3
+        assert 'release' in lines[0] and '0.2.0 (' in lines[0]
+        assert 'feature' in lines[2]
+
+        # Undo release across invocations
+        args = parser.parse_args(['-c', cfg_path, 'undo'])
+        args.func(args)
+        changelog = main.get_changelog(cfg_path)
+        assert str(changelog.last_entry.version) == '0.1.0+1'
+        assert len(changelog.last_entry.messages) == 2
+
+        args = parser.parse_args(['-c', cfg_path, 'undo', '-n', '2'])
+        args.func(args)
+        with open(changelog_path) as fd:
+            assert fd.read() == initial
+
+        with pytest.raises(SystemExit) as exc:
+            args.func(args)
+        assert exc.value.code == 99
+
+
+def test_render(parser, capsys):
+    with get_test_config() as cfg_path:
+        with open(cfg_path, 'a') as fd:
+            fd.write('\n[templates]\npreset = text\n'
+                     'message = \\t+ {text}\n')
+        args = parser.parse_args(['-c', cfg_path, 'feature', 'One'])
+        args.func(args)
+
+        args = parser.parse_args(['-c', cfg_path, 'render'])
+        args.func(args)
+        assert capsys.readouterr().out == \
+            'Changelog\n\n0.1.0+1 (UNRELEASED)\n\t+ One\n'
+
+        out = op.join(op.dirname(cfg_path), 'CHANGELOG.html')
+        args = parser.parse_args(['-c', cfg_path, 'render', '--preset',
+                                  'html', '-o', out])
+        args.func(args)
+        with open(out) as fd:
+            assert '<li>[Feature] One</li>' in fd.read()
+
+
+def test_render_literal_percent(parser, capsys):
+    with get_test_config() as cfg_path:
+        with open(cfg_path, 'a') as fd:
+            fd.write('\n[templates]\npreset = html\n'
+                     'message = <li style="width:100%">{text}</li>\n')
+        args = parser.parse_args(['-c', cfg_path, 'feature', 'One'])
+        args.func(args)
+        args = parser.parse_args(['-c', cfg_path, 'render'])
+        args.func(args)
+        assert '<li style="width:100%">One</li>' in capsys.readouterr().out
+
+
+def test_broken_config(parser):
+    with get_test_config() as cfg_path:
+        with open(cfg_path, 'a') as fd:
+            fd.write('\n[md-changelog]\nmode = group\n')  # duplicate
+        with pytest.raises(ChangelogError) as err:
+            main.get_config(cfg_path)
+        assert 'Broken config' in str(err.value)
+
+
+def test_watch_once(parser):
+    with get_test_config() as cfg_path:
+        out_dir = op.join(op.dirname(cfg_path), 'notes')
+        args = parser.parse_args(['-c', cfg_path, 'watch', '--once',
+                                  '--out', out_dir])
+        args.func(args)
+        assert op.isfile(op.join(out_dir, '0.1.0+1.md'))
+        assert op.isfile(op.join(out_dir, 'changelog.json'))
+
+
+def test_custom_message_types():
+    with get_test_config() as cfg_path:
+        with open(cfg_path, 'a') as fd:
+            fd.write('\n[types]\nsecurity = Security\nrelease = Release\n')
+        config = main.get_config(cfg_path)
+
+        # Message type conflicting with the command is skipped
+        parser = main.create_parser()
+        args = parser.parse_args(['-c', cfg_path, 'security', 'Fixed XSS'])
+        args.func(args)
+        args = parser.parse_args(['-c', cfg_path, 'release', '-y'])
+        assert args.func is main.release
+
+        changelog = Changelog.parse(path=config['md-changelog']['changelog'])
+        message = changelog.last_entry.messages[0]
+        assert message.type == 'Security'
+        assert message.eval() == '[Security] Fixed XSS'
+
+
+def test_custom_message_types_conflict():
+    with get_test_config() as cfg_path:
+        with open(cfg_path, 'a') as fd:
+            fd.write('\n[types]\nfeature = Feat\n')
+        with mock.patch('sys.argv', ['md-changelog', '-c', cfg_path,
+                                     'feature', 'x']):
+            with pytest.raises(SystemExit) as exc_info:
+                main.main()
+        assert exc_info.value.code == 99
+        assert tokens.MESSAGE_TYPES['feature'] == tokens.TYPES.feature
+
+
+def test_aggregate(parser, capsys):
+    with get_test_config() as cfg_1, get_test_config() as cfg_2:
+        for cfg_path, version in ((cfg_1, '0.2.0'), (cfg_2, '0.3.0')):
+            args = parser.parse_args(['-c', cfg_path, 'feature',
+                                      'Release ' + version.replace('.', '')])
+            args.func(args)
+            args = parser.parse_args(['-c', cfg_path, 'release', '-y',
+                                      '-v', version])
+            args.func(args)
+
+        args = parser.parse_args(['aggregate', cfg_1, cfg_2, '--limit', '1'])
+        args.func(args)
+        out = capsys.readouterr().out
+        project = op.basename(op.dirname(cfg_1))
+        assert '%s 0.2.0 (' % project in out
+        assert '* [Feature] Release 020' in out
+        assert '0.3.0' not in out
+
+
+def test_aggregate_conflicting_types(parser, capsys, caplog):
+    with get_test_config() as cfg_1, get_test_config() as cfg_2:
+        for cfg_path, value in ((cfg_1, 'Security'), (cfg_2, 'Sec')):
+            with open(cfg_path, 'a') as fd:
+                fd.write('\n[types]\nsecurity = %s\n' % value)
+        args = parser.parse_args(['-c', cfg_1, 'release', '-y',
+                                  '-v', '0.2.0'])
+        args.func(args)
+
+        # Project with conflicting types is skipped
+        args = parser.parse_args(['aggregate', cfg_1, cfg_2])
+        args.func(args)
+        assert '0.2.0 (' in capsys.readouterr().out
+        assert 'skip %s' % cfg_2 in caplog.text
+
+        # Broken changelog is reported with its project
+        with open(main.get_config(cfg_1)['md-changelog']['changelog'],
+                  'a') as fd:
+            fd.write('* [Bogus] Unknown type\n')
+        args = parser.parse_args(['aggregate', cfg_1])
+        caplog.set_level('INFO', logger='md-changelog')
+        with pytest.raises(SystemExit):
+            args.func(args)
+        assert 'Broken changelog of %s' % op.basename(op.dirname(cfg_1)) \
+            in caplog.text
+
+
+def test_publish(parser):
+    with get_test_config() as cfg_path:
+        out_dir = op.join(op.dirname(cfg_path), 'site')
+        args = parser.parse_args(['-c', cfg_path, 'release', '-y',
+                                  '--bump', 'patch'])
+        args.func(args)
+        args = parser.parse_args(['-c', cfg_path, 'publish', '--out',
+                                  out_dir])
+        args.func(args)
+        assert op.isfile(op.join(out_dir, '0.1.1.html'))
+        assert op.isfile(op.join(out_dir, 'index.html'))
+        assert op.isfile(op.join(out_dir, 'feed.xml'))
+
+
+def test_project_context(parser, monkeypatch):
+    with get_test_config() as cfg_path:
+        root = op.dirname(cfg_path)
+        nested = op.join(root, 'packages', 'lib', 'src')
+        os.makedirs(nested)
+        monkeypatch.chdir(nested)
+
+        # Config is discovered upwards and memoized
+        with mock.patch('md_changelog.main.get_config',
+                        wraps=main.get_config) as get_config_mock:
+            context = main.ProjectContext.resolve()
+            assert context.config_path == cfg_path
+            assert context.changelog_path == op.join(root,
+                                                     main.CHANGELOG_NAME)
+            assert main.ProjectContext.resolve() is context
+            assert main.ProjectContext.resolve(cfg_path) is context
+            assert context.vcs is context.vcs
+            assert get_config_mock.call_count == 1
+
+        # Handlers get the context, commands work from any subdirectory
+        args = parser.parse_args(['feature', 'Nested'])
+        args.func(args)
+        assert context.changelog().last_entry.messages[0].text == 'Nested'
+
+        # Changelog path may be relative to the config directory
+        main.ProjectContext.clear()
+        config = main.get_config(cfg_path)
+        config['md-changelog']['changelog'] = main.CHANGELOG_NAME
+        with open(cfg_path, 'w') as fd:
+            config.write(fd)
+        context = main.ProjectContext.resolve()
+        assert context.changelog_path == op.join(root, main.CHANGELOG_NAME)
+        main.ProjectContext.clear()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        monkeypatch.chdir(tmp_dir)
+        with pytest.raises(ConfigNotFoundError):
+            main.ProjectContext.resolve()
+        args = parser.parse_args(['last'])
+        with pytest.raises(SystemExit) as exc:
+            args.func(args)
+        assert exc.value.code == 99
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+import os
+import os.path as op
+import tempfile
+from xml.etree import ElementTree
+
+from md_changelog import tokens
+from md_changelog.entry import Changelog, LogEntry
+from md_changelog.publish import Publisher
+from md_changelog.tokens import Message
+
+
+def make_changelog():
+    changelog = Changelog(path=None)
+    for i in range(3):
+        entry = LogEntry(version=tokens.Version('0.%d.0' % i),
+                         date=tokens.Date('2017-01-0%d' % (i + 1)))
+        entry.add_message(Message(text='Feature <%d>' % i,
+                                  message_type=tokens.TYPES.feature))
+        changelog.add_entry(entry)
+    changelog.new_entry()
+    return changelog
+
+
+def test_publish_incremental():
+    changelog = make_changelog()
+    with tempfile.TemporaryDirectory() as out_dir:
+        publisher = Publisher(out_dir, title='Project',
+                              base_url='https://example.com/', feed_size=2)
+        written = publisher.publish(changelog)
+        assert sorted(op.basename(path) for path in written) == [
+            '0.0.0.html', '0.1.0.html', '0.2.0.html', 'feed.xml',
+            'index.html']
+        with open(op.join(out_dir, '0.1.0.html')) as fd:
+            page = fd.read()
+        assert '<strong>[Feature]</strong> Feature &lt;1&gt;' in page
+
+        feed = ElementTree.parse(op.join(out_dir, 'feed.xml')).getroot()
+        ns = '{http://www.w3.org/2005/Atom}'
+        links = [link.get('href') for link in feed.iter(ns + 'link')]
+        assert links == ['https://example.com/index.html',
+                         'https://example.com/0.2.0.html',
+                         'https://example.com/0.1.0.html']
+
+        # Nothing is changed
+        assert publisher.publish(changelog) == []
+
+        # Release new version and change the old one
+        changelog.entries[0].add_message(Message(text='Fixed'))
+        changelog.last_entry.set_version(tokens.Version('0.3.0'))
+        changelog.last_entry.set_date(tokens.Date('2017-01-05'))
+        written = publisher.publish(changelog)
+        assert sorted(op.basename(path) for path in written) == [
+            '0.0.0.html', '0.3.0.html', 'feed.xml', 'index.html']
+
+        # Removed entry page is removed
+        del changelog.entries[1]
+        publisher.publish(changelog)
+        assert not op.exists(op.join(out_dir, '0.1.0.html'))
+
+        # Missing page is written again
+        os.remove(op.join(out_dir, '0.2.0.html'))
+        written = publisher.publish(changelog)
+        assert [op.basename(path) for path in written] == ['0.2.0.html']
+
+        # Pages render the title, so all of them are rebuilt on its change
+        publisher = Publisher(out_dir, title='New title',
+                              base_url='https://example.com/', feed_size=2)
+        written = publisher.publish(changelog)
+        assert sorted(op.basename(path) for path in written) == [
+            '0.0.0.html', '0.2.0.html', '0.3.0.html', 'feed.xml',
+            'index.html']
+        with open(op.join(out_dir, '0.2.0.html')) as fd:
+            assert '<title>New title 0.2.0</title>' in fd.read()
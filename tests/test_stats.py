@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+import os.path as op
+import tempfile
+
+import mock
+
+from md_changelog import stats
+from md_changelog.entry import Changelog
+from tests.test_entry import get_fixtures
+
+
+def test_collect_incremental():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = op.join(tmp_dir, 'Changelog.md')
+        changelog = Changelog.from_text(get_fixtures('Changelog.md'),
+                                        path=path)
+        changelog.save()
+
+        releases, unreleased = stats.collect(path)
+        assert [item['version'] for item in releases] == ['0.1.0']
+        assert unreleased['messages'] == 13
+        assert stats.changelog_stats(path) == changelog.stats()
+
+        # Release and add new entry: only new entries are parsed
+        changelog.last_entry.set_version(changelog.next_version())
+        changelog.last_entry.set_date(changelog.entries[0].date)
+        changelog.new_entry()
+        changelog.save()
+        with mock.patch.object(Changelog, 'parse_entries',
+                               wraps=Changelog.parse_entries) as parse_mock:
+            releases, unreleased = stats.collect(path)
+        assert parse_mock.call_count == 2
+        assert [item['version'] for item in releases] == ['0.1.0', '0.2.0']
+        assert unreleased['messages'] == 0
+
+        # Unchanged file is not parsed at all
+        with mock.patch.object(Changelog, 'parse_entries') as parse_mock:
+            assert stats.collect(path) == (releases, unreleased)
+        assert not parse_mock.called
+
+        # Changed history is recomputed
+        with open(path) as fd:
+            content = fd.read()
+        with open(path, 'w') as fd:
+            fd.write(content.replace('* Initial release\n', ''))
+        releases, _ = stats.collect(path)
+        assert releases[0]['messages'] == 1
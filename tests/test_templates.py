@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from md_changelog import tokens
+from md_changelog.entry import Changelog
+from md_changelog.exceptions import ChangelogError
+from md_changelog.templates import Renderer, compile_template
+from md_changelog.tokens import Message
+from tests.test_entry import get_fixtures
+
+
+@pytest.fixture
+def changelog():
+    changelog = Changelog.from_text(get_fixtures('Changelog.md'))
+    changelog.last_entry.add_message(Message(
+        text='Fixed <b> & *stars*', message_type=tokens.TYPES.bugfix,
+        author='bob'))
+    return changelog
+
+
+def test_compile_template():
+    render = compile_template('message', '{label!s:>12}|{text}|100%')
+    assert render(type='', label='[Feature] ', text='New', author='',
+                  by='') == '  [Feature] |New|100%'
+
+    with pytest.raises(ChangelogError) as err:
+        compile_template('message', '{version} {text}')
+    assert 'Unknown field {version}' in str(err.value)
+    with pytest.raises(ChangelogError):
+        compile_template('entry', '{header')
+    with pytest.raises(ChangelogError) as err:
+        compile_template('message', '{text!x}')
+    assert 'Unknown conversion !x' in str(err.value)
+    with pytest.raises(ChangelogError):
+        compile_template('message', '{text:d}')
+
+    render = compile_template('document', '100% static')
+    assert render(title='', title_rule='', entries='') == '100% static'
+    render = compile_template('entry', '{version!r} {date!a:.6}')
+    assert render(version='1.0', date='2016-03-11', header='', header_rule='',
+                  messages='') == "'1.0' '2016-"
+
+
+def test_renderer_presets(changelog):
+    # Markdown preset is the same as the changelog file
+    assert Renderer().render_changelog(changelog) == changelog.eval()
+
+    html = Renderer(preset='html').render_changelog(changelog)
+    assert '<h2>0.1.0 (2016-03-11)</h2>' in html
+    assert '<li>[Bugfix] Fixed &lt;b&gt; &amp; *stars* (@bob)</li>' in html
+
+    rst = Renderer(preset='rst').render_changelog(changelog)
+    assert '* [Bugfix] Fixed <b> & \\*stars\\* (@bob)' in rst
+    assert '0.1.0 (2016-03-11)\n------------------\n\n* Initial' in rst
+
+    text = Renderer(preset='text').render_changelog(changelog)
+    assert '0.1.0 (2016-03-11)\n  - Initial release' in text
+
+
+def test_renderer_from_config(changelog):
+    renderer = Renderer.from_config({
+        'preset': 'markdown',
+        'title': 'Release notes',
+        'entry': '## {version}\\n{messages}',
+        'message': '- {text}{by}',
+    })
+    output = renderer.render(changelog.entries[:1])
+    assert output == 'Release notes\n=============\n\n' \
+                     '## 0.1.0\n- Initial release\n' \
+                     '- very basic SelectQuery and InsertQuery ' \
+                     'functionality\n\n'
+    # Preset passed explicitly ignores the config templates
+    renderer = Renderer.from_config({'message': '- {text}'}, preset='html')
+    assert renderer.preset == 'html'
+
+    with pytest.raises(ChangelogError):
+        Renderer.from_config({'footer': '{title}'})
+    with pytest.raises(ChangelogError):
+        Renderer(preset='pdf')
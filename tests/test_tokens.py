@@ -3,6 +3,7 @@ import pytest
 from datetime import datetime
 
 from md_changelog import tokens
+from md_changelog.exceptions import WrongMessageTypeError
 
 
 @pytest.fixture
@@ -57,4 +58,139 @@ def test_message():
     message = tokens.Message.parse(message)
     assert isinstance(message, tokens.Message)
     assert message._type == tokens.TYPES.bugfix
-    assert message._text == 'Test commit'
\ No newline at end of file
+    assert message._text == 'Test commit'
+
+    # Comparison with other objects doesn't fail
+    assert message != None  # noqa: E711
+    assert message != 'Test commit'
+    assert message not in [None, 1]
+
+
+def test_message_author():
+    message = tokens.Message(text='Test commit',
+                             message_type=tokens.TYPES.bugfix,
+                             author='Jane Roe')
+    assert message.eval() == '[Bugfix] Test commit (@Jane Roe)'
+    assert message.eval(typed=False) == 'Test commit (@Jane Roe)'
+
+    parsed = tokens.Message.parse('* %s' % message.eval())
+    assert parsed.type == tokens.TYPES.bugfix
+    assert parsed.text == 'Test commit'
+    assert parsed.author == 'Jane Roe'
+    # Author is not a part of the message identity
+    assert parsed == tokens.Message(text='Test commit',
+                                    message_type=tokens.TYPES.bugfix)
+
+    parsed = tokens.Message.parse('* Call f(x) (@bob)')
+    assert (parsed.text, parsed.author) == ('Call f(x)', 'bob')
+    assert tokens.Message.parse('* Call f(x)').author is None
+
+
+def test_message_from_commit():
+    def parse(commit_message):
+        message = tokens.Message.from_commit(commit_message, author='bob')
+        return message.type, message.text, message.author
+
+    assert parse('feat(cli): New command\n\nDetails') == (
+        tokens.TYPES.feature, 'New command', 'bob')
+    assert parse('[Bugfix] Fixed crash') == (
+        tokens.TYPES.bugfix, 'Fixed crash', 'bob')
+    assert parse('improvement: Faster parsing') == (
+        tokens.TYPES.improvement, 'Faster parsing', 'bob')
+    assert parse('WIP: Draft') == (tokens.TYPES.message, 'WIP: Draft', 'bob')
+    assert parse('Plain subject') == (
+        tokens.TYPES.message, 'Plain subject', 'bob')
+    assert tokens.Message.from_commit('  \n') is None
+
+
+def test_version_precedence():
+    ordered = ['1.0.0.dev1', '1.0.0-alpha', '1.0.0-alpha.1', '1.0.0a2',
+               '1.0.0-beta', '1.0.0rc1', '1.0.0-rc.2', '1.0.0',
+               '1.0.0.post1.dev1', '1.0.0.post1', '1.0.1', '1.10.0']
+    versions = [tokens.Version(v) for v in ordered]
+    assert tokens.sort_versions(reversed(versions)) == versions
+    assert [v.version_str for v in tokens.sort_versions(
+        reversed(versions))] == ordered
+
+    # PEP 440 and semver spellings are equal
+    assert tokens.Version('1.0.0rc1') == tokens.Version('1.0.0-rc.1')
+    assert tokens.Version('1.0.0c1') == tokens.Version('1.0.0rc1')
+
+    # Build metadata and unreleased suffix don't affect precedence
+    v = tokens.Version('1.0.0+build.5')
+    assert v.released is True
+    assert v.build == 'build.5'
+    assert v == tokens.Version('1.0.0')
+    assert v.public == '1.0.0'
+    assert str(v.unreleased()) == '1.0.0+1'
+
+    v = tokens.Version.parse('0.1.0+1 (UNRELEASED)')
+    assert v.released is False
+    assert v.eval() == '0.1.0+1'
+    assert v == tokens.Version('0.1.0')
+    assert str(v.unreleased()) == '0.1.0+1'
+    assert str(tokens.Version('1.0.0-rc.1+b2').unreleased()) == '1.0.0-rc.1+1'
+
+    with pytest.raises(ValueError):
+        tokens.Version('1.0')
+
+
+def test_version_bump():
+    v = tokens.Version('1.2.3')
+    assert str(v.bump('major')) == '2.0.0'
+    assert str(v.bump('minor')) == '1.3.0'
+    assert str(v.bump('patch')) == '1.2.4'
+    assert str(tokens.Version('1.2.3+1').bump('patch')) == '1.2.4'
+
+    # Pre-release is bumped to its final release
+    assert str(tokens.Version('2.0.0-rc.1').bump('major')) == '2.0.0'
+    assert str(tokens.Version('2.1.0rc1').bump('major')) == '3.0.0'
+    assert str(tokens.Version('2.1.0b1').bump('minor')) == '2.1.0'
+    assert str(tokens.Version('2.1.1.dev1').bump('patch')) == '2.1.1'
+
+    with pytest.raises(ValueError):
+        v.bump('build')
+
+
+def test_custom_message_type():
+    with pytest.raises(WrongMessageTypeError):
+        tokens.Message.parse('* [Deprecation] Old API')
+
+    tokens.register_type('deprecation', 'Deprecated')
+    assert tokens.MESSAGE_TYPES['deprecation'] == 'Deprecated'
+    assert tokens.custom_types()['deprecation'] == 'Deprecated'
+    assert tokens.type_name('Deprecated') == 'deprecation'
+    assert tokens.group_title('Deprecated') == 'Deprecated'
+
+    for line in ('* [Deprecation] Old API', '* [deprecated] Old API'):
+        message = tokens.Message.parse(line)
+        assert message.type == 'Deprecated'
+        assert message.eval() == '[Deprecated] Old API'
+
+    # Built-in types are case insensitive
+    assert tokens.Message.parse('* [FEATURE] x').type == tokens.TYPES.feature
+    assert tokens.Message.parse('* [Message] x').type == tokens.TYPES.message
+
+    with pytest.raises(WrongMessageTypeError):
+        tokens.register_type('bad type')
+
+    # Built-in and registered types can't be overridden
+    for name, value in (('feature', 'Feat'), ('feat', 'Feature'),
+                        ('message', 'Note'), ('old', 'Deprecated')):
+        with pytest.raises(WrongMessageTypeError):
+            tokens.register_type(name, value)
+    assert tokens.MESSAGE_TYPES['feature'] == tokens.TYPES.feature
+    # Registering the same type again is fine, e.g config is re-read
+    tokens.register_type('deprecation', 'Deprecated')
+
+    # Group title is set by config value after comma
+    tokens.register_types({'security': 'Security, Security fixes'})
+    assert tokens.MESSAGE_TYPES['security'] == 'Security'
+    assert tokens.group_title('Security') == 'Security fixes'
+    with pytest.raises(WrongMessageTypeError):
+        tokens.register_type('perf', 'Performance', title='Features')
+
+    tokens.reset_types()
+    assert tokens.custom_types() == {}
+    with pytest.raises(WrongMessageTypeError):
+        tokens.Message.parse('* [Deprecation] Old API')
@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
+import mock
 import pytest
 
 
@@ -12,3 +13,58 @@ def test_git_backend():
     assert email == 'ekimovsky.maksim@gmail.com'
     assert name == 'Maksim Ekimovskii'
 
+
+def test_git_backend_tags():
+    from md_changelog.utils.git import GitBackend
+
+    git = GitBackend(path='/tmp')
+    output = 'v0.1.0\t2016-07-06\nv0.2.0\t2017-06-04'
+    with mock.patch.object(GitBackend, 'call_cmd',
+                           return_value=output) as call_mock:
+        assert git.get_tags() == {'v0.1.0': '2016-07-06',
+                                  'v0.2.0': '2017-06-04'}
+    # Single call for all the tags
+    assert call_mock.call_count == 1
+    assert 'for-each-ref' in call_mock.call_args[0]
+    assert call_mock.call_args[1] == {'cwd': '/tmp'}
+
+
+def test_git_backend_is_modified():
+    from md_changelog.utils.git import GitBackend
+
+    git = GitBackend()
+    for output, expected in ((' M Changelog.md', True), ('', False)):
+        with mock.patch.object(GitBackend, 'call_cmd',
+                               return_value=output) as call_mock:
+            assert git.is_modified('/tmp/Changelog.md') is expected
+        assert call_mock.call_args[0][-1] == 'Changelog.md'
+        assert call_mock.call_args[1] == {'cwd': '/tmp'}
+
+
+def test_git_backend_identity():
+    from md_changelog.utils.git import GitBackend
+
+    output = 'user.name Jane Roe\nuser.email jane@example.com'
+    with mock.patch.object(GitBackend, 'call_cmd',
+                           return_value=output) as call_mock, \
+            mock.patch.dict(GitBackend._identities, clear=True):
+        git = GitBackend(path='/tmp')
+        assert git.get_user_name() == 'Jane Roe'
+        assert git.get_user_email() == 'jane@example.com'
+        # Identity is resolved once per process
+        assert GitBackend(path='/tmp').get_user_name() == 'Jane Roe'
+    assert call_mock.call_count == 1
+
+
+def test_git_backend_log():
+    from md_changelog.utils.git import GitBackend
+
+    git = GitBackend(path='/tmp')
+    output = 'Jane Roe\x1ffeat: New command\nBob\x1fFixed crash'
+    with mock.patch.object(GitBackend, 'call_cmd',
+                           return_value=output) as call_mock:
+        assert git.get_log('v0.1.0..HEAD') == [
+            ('Jane Roe', 'feat: New command'), ('Bob', 'Fixed crash')]
+    # Single call for all the commits and authors
+    assert call_mock.call_count == 1
+    assert 'v0.1.0..HEAD' in call_mock.call_args[0]
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+import json
+import os.path as op
+import tempfile
+
+import mock
+import pytest
+
+from md_changelog.entry import Changelog
+from md_changelog.watch import Watcher
+from tests.test_entry import get_fixtures
+
+
+def test_watcher_update():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = op.join(tmp_dir, 'Changelog.md')
+        out_dir = op.join(tmp_dir, 'out')
+        with open(path, 'w') as fd:
+            fd.write(get_fixtures('Changelog.md'))
+
+        watcher = Watcher(path, out_dir=out_dir)
+        paths = watcher.update()
+        assert sorted(op.basename(p) for p in paths) == [
+            '0.1.0+1.md', '0.1.0.md', 'LATEST.md', 'changelog.json']
+        with open(op.join(out_dir, 'changelog.json')) as fd:
+            data = json.load(fd)
+        assert [item['version'] for item in data] == ['0.1.0+1', '0.1.0']
+        assert data[1]['messages'][1] == {
+            'type': 'feature',
+            'text': 'very basic SelectQuery and InsertQuery functionality'}
+
+        # Nothing is changed
+        assert watcher.update() == []
+
+        # Release the last entry: only it is re-parsed
+        with open(path) as fd:
+            content = fd.read()
+        with open(path, 'w') as fd:
+            fd.write(content.replace('0.1.0+1 (UNRELEASED)',
+                                     '0.2.0 (2016-04-01)'))
+        assert watcher.stamp() != watcher._stamp
+        with mock.patch.object(Changelog, 'parse_entries',
+                               wraps=Changelog.parse_entries) as parse_mock:
+            paths = watcher.update()
+        assert parse_mock.call_count == 1
+        assert sorted(op.basename(p) for p in paths) == [
+            '0.2.0.md', 'LATEST.md', 'changelog.json']
+        assert not op.exists(op.join(out_dir, '0.1.0+1.md'))
+        assert watcher.stamp() == watcher._stamp
+
+        # Broken file doesn't stop the watcher, the outputs are kept
+        with open(path, 'w') as fd:
+            fd.write(content.replace('* [Feature]', '* [Bogus]'))
+        assert watcher.try_update() is None
+        assert op.exists(op.join(out_dir, '0.2.0.md'))
+        assert watcher.stamp() == watcher._stamp
+        with mock.patch('builtins.open', side_effect=FileNotFoundError):
+            assert watcher.try_update() is None
+
+
+def test_watcher_wait_change():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = op.join(tmp_dir, 'Changelog.md')
+        with open(path, 'w') as fd:
+            fd.write(get_fixtures('Changelog.md'))
+        watcher = Watcher(path, out_dir=tmp_dir, interval=0, debounce=0)
+        watcher.update()
+
+        stamps = iter([watcher._stamp, None, (1, 1), (2, 2), (2, 2)])
+        with mock.patch.object(Watcher, 'stamp',
+                               side_effect=lambda: next(stamps)):
+            watcher.wait_change()
+        # Wait until the file stays the same
+        assert next(stamps, 'done') == 'done'
+
+
+def test_watcher_run_survives_errors():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = op.join(tmp_dir, 'Changelog.md')
+        with open(path, 'w') as fd:
+            fd.write(get_fixtures('Changelog.md').replace(
+                '* [Feature]', '* [Bogus]'))
+        watcher = Watcher(path, out_dir=tmp_dir, interval=0, debounce=0)
+
+        updates = iter([ValueError('broken'), OSError('missing'), []])
+
+        def update():
+            result = next(updates)
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        with mock.patch.object(Watcher, 'update', side_effect=update), \
+                mock.patch.object(Watcher, 'wait_change',
+                                  side_effect=[None, None, KeyboardInterrupt]):
+            with pytest.raises(KeyboardInterrupt):
+                watcher.run()
+        assert next(updates, 'done') == 'done'